@@ -29,10 +29,15 @@ def test_regenerate_button_detection():
         
         if button:
             print(f"✅ 再生成ボタンを検出しました!")
-            print(f"ボタンテキスト: '{button.text}'")
-            print(f"ボタンタグ: {button.tag_name}")
-            print(f"ボタンクラス: {button.get_attribute('class')}")
-            print(f"表示状態: {button.is_displayed()}")
+            # ボタンの属性は1回のexecute_scriptでまとめて取得
+            displayed, text, tag, classes = tool.driver.execute_script(
+                "const e = arguments[0]; return [e.offsetParent !== null, (e.innerText || '').trim(), e.tagName.toLowerCase(), e.className || ''];",
+                button
+            )
+            print(f"ボタンテキスト: '{text}'")
+            print(f"ボタンタグ: {tag}")
+            print(f"ボタンクラス: {classes}")
+            print(f"表示状態: {displayed}")
             
             # クリックテスト
             print("\nクリックテストを実行しますか？ (y/n): ", end="")
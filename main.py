@@ -6,41 +6,490 @@ MacのChromeブラウザを自動で操作し、特定のサイトのボタン
 """
 
 import time
+import argparse
 import logging
 import os
 import platform
 import random
 import json
 import re
+import itertools
+import queue
+import select
+import subprocess
+import sys
+import threading
+import shutil
+import urllib.request
 from datetime import datetime
 from pathlib import Path
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+
+try:
+    # 任意依存: インストールされていればキーワード一括検索を1パスで行う
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+def _build_keyword_matcher(keywords):
+    """複数キーワードの検索関数を作成（最初に見つかったキーワードを返す、大文字小文字は無視）"""
+    keywords = [keyword.lower() for keyword in keywords]
+
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for keyword in keywords:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+
+        def find_first(text):
+            for _, keyword in automaton.iter(text.lower()):
+                return keyword
+            return None
+    else:
+        # フォールバック: 正規表現の選択パターン1回の走査で検索（C実装の正規表現エンジンを利用）
+        pattern = re.compile("|".join(re.escape(keyword) for keyword in keywords), re.IGNORECASE)
+
+        def find_first(text):
+            match = pattern.search(text)
+            return match.group(0).lower() if match else None
+
+    return find_first
+
+
+# ページ内に表示中のThinking系インジケーターがあるかを判定するJS関数（以下のスクリプトの先頭に連結して使う）
+# page_sourceを転送せずブラウザ側で判定する
+_PAGE_THINKING_HELPERS_JS = """
+function pageThinking() {
+  const s = document.evaluate(
+    "//*[contains(@class, 'thinking') or contains(text(), 'Thinking') or contains(text(), 'thinking')" +
+    " or contains(text(), '考え中') or contains(text(), '生成中')]",
+    document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  for (let i = 0; i < s.snapshotLength; i++) {
+    if (s.snapshotItem(i).offsetParent !== null) return true;
+  }
+  return false;
+}
+"""
+
+# ストリーミング監視対象の状態を取得するスクリプト
+# arguments[0]: 候補セレクター（優先順）, arguments[1]/[2]: 前回のテキスト長/末尾
+# テキスト本体は前回から変化した場合のみ返す
+_STREAMING_STATE_JS = _PAGE_THINKING_HELPERS_JS + """
+const [selectors, prevLength, prevTail] = arguments;
+for (const sel of selectors) {
+  const els = [...document.querySelectorAll(sel)]
+    .filter(e => e.offsetParent !== null && (e.innerText || '').trim().length > 0);
+  if (!els.length) continue;
+  const e = els[els.length - 1];
+  const t = (e.innerText || '').trim();
+  const tail = t.slice(-64);
+  const changed = t.length !== prevLength || tail !== prevTail;
+  return {length: t.length, tail: tail, text: changed ? t : null, classes: e.getAttribute('class') || '',
+          pageThinking: pageThinking()};
+}
+return null;
+"""
+
+# 表示中・有効なボタンのうちテキスト/クラス/IDに送信系キーワードを含む最初の要素を探すスクリプト
+# 戻り値: [要素, テキスト, クラス, outerHTML（withHtml指定時のみ）] または null
+_FIND_SUBMIT_BUTTON_JS = """
+const [keywords, withHtml] = arguments;
+for (const b of document.querySelectorAll('button')) {
+  if (b.offsetParent === null || b.disabled) continue;
+  const text = (b.innerText || '').trim().toLowerCase();
+  const classes = b.getAttribute('class') || '';
+  const id = (b.id || '').toLowerCase();
+  const classesLower = classes.toLowerCase();
+  if (keywords.some(k => text.includes(k) || classesLower.includes(k) || id.includes(k))) {
+    return [b, text, classes, withHtml ? b.outerHTML : null];
+  }
+}
+return null;
+"""
+
+# [種類（css/xpath）, セレクター]のリストを順に試し、最初の一致要素が表示中・有効なら[要素, 位置, outerHTML]を返すスクリプト
+# （outerHTMLはarguments[1]のwithHtml指定時のみ）
+_FIND_FIRST_USABLE_JS = """
+const [locators, withHtml] = arguments;
+for (const [i, [type, selector]] of locators.entries()) {
+  const e = type === 'xpath'
+    ? document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+    : document.querySelector(selector);
+  if (e && e.offsetParent !== null && !e.disabled) return [e, i, withHtml ? e.outerHTML : null];
+}
+return null;
+"""
+
+# 起点要素から親へ遡りながら相対XPathを順に試し、最初の表示中・有効な要素を[要素, XPath, outerHTML]で返すスクリプト
+# （outerHTMLはwithHtml指定時のみ）
+_FIND_SIBLING_SUBMIT_JS = """
+const [start, xpaths, levels, withHtml] = arguments;
+let node = start;
+for (let level = 0; level < levels && node; level++) {
+  for (const xpath of xpaths) {
+    const e = document.evaluate(xpath, node, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (e && e.offsetParent !== null && !e.disabled) return [e, xpath, withHtml ? e.outerHTML : null];
+  }
+  node = node.parentElement;
+}
+return null;
+"""
+
+# XPathに一致する要素のうち最初の表示中のもののテキストを返すスクリプト（なければnull）
+_FIRST_VISIBLE_TEXT_JS = """
+const s = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < s.snapshotLength; i++) {
+  const e = s.snapshotItem(i);
+  if (e.offsetParent !== null) return (e.innerText || '').trim();
+}
+return null;
+"""
+
+# セレクターを優先順に試し、最初に見つかった[要素, セレクター]を返すスクリプト（なければnull）
+_FIND_FIRST_PRESENT_JS = """
+for (const selector of arguments[0]) {
+  const e = document.querySelector(selector);
+  if (e) return [e, selector];
+}
+return null;
+"""
+
+# message-content-idの最大値（メッセージがなければ0）
+_MAX_MESSAGE_ID_JS = """
+return Math.max(0, ...[...document.querySelectorAll('[message-content-id]')]
+  .map(e => parseInt(e.getAttribute('message-content-id'), 10) || 0));
+"""
+
+# 指定IDより新しいメッセージ要素のうち、送信したプロンプトと異なるものがあるか
+_NEW_MESSAGE_APPEARED_JS = """
+const [lastId, prompt] = arguments;
+return [...document.querySelectorAll('[message-content-id]')].some(e =>
+  (parseInt(e.getAttribute('message-content-id'), 10) || 0) > lastId && (e.innerText || '').trim() !== prompt);
+"""
+
+# 再生成ボタンのAND条件（「応答を再生成」テキストを含むdiv かつ 表示中のdiv.button）を判定するスクリプト
+_SCAN_REGENERATE_BUTTON_JS = """
+const snapshot = document.evaluate("//div[contains(text(), '応答を再生成')]", document, null,
+                                   XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const regenerateDivs = [];
+for (let i = 0; i < snapshot.snapshotLength; i++) regenerateDivs.push(snapshot.snapshotItem(i));
+const buttonDivs = [...document.querySelectorAll('div.button')];
+const visible = e => e.offsetParent !== null;
+const displayedRegenerate = regenerateDivs.filter(visible);
+return {
+  button: displayedRegenerate.find(e => e.matches('div.button')) || null,
+  regenerateCount: regenerateDivs.length,
+  buttonCount: buttonDivs.length,
+  displayedRegenerateCount: displayedRegenerate.length,
+  displayedButtonCount: buttonDivs.filter(visible).length
+};
+"""
+
+# 初期状態にない応答要素（Thinking系クラス以外）か、表示中の再生成ボタンが存在するかを判定するスクリプト
+_RESPONSE_OR_REGENERATE_JS = """
+const known = new Set(arguments[0]);
+const thinking = /(?:^|\\s)thinking(?:[_-][\\w-]*)?(?=\\s|$)/i;
+const visible = e => e.offsetParent !== null;
+return [...document.querySelectorAll('[message-content-id]')].some(e =>
+    !known.has(e.getAttribute('message-content-id')) && visible(e) &&
+    !thinking.test(e.getAttribute('class') || '') && (e.innerText || '').trim() !== '') ||
+  [...document.querySelectorAll('div.button')].some(e => visible(e) && e.textContent.includes('応答を再生成'));
+"""
+
+# 入力欄に値を設定してinputイベントを発火するスクリプト（テキストは引数で受け取る）
+_SET_INPUT_VALUE_JS = """
+arguments[0].value = arguments[1];
+arguments[0].dispatchEvent(new Event('input', {bubbles: true}));
+"""
+
+# message-content-id属性を持つ全要素のID・表示状態・テキスト・クラス（必要ならouterHTML）を取得するスクリプト
+_MESSAGE_ELEMENTS_JS = """
+const withHtml = arguments[0];
+return [...document.querySelectorAll('[message-content-id]')].map(e => {
+  const displayed = e.offsetParent !== null;
+  return {element: e, id: e.getAttribute('message-content-id') || '', displayed: displayed,
+          text: displayed ? (e.innerText || '').trim() : '', classes: e.getAttribute('class') || '',
+          html: withHtml ? e.outerHTML : null};
+});
+"""
+
+# コピーボタン検出用のJS関数群（以下の各スクリプトの先頭に連結して使う）
+_COPY_BUTTON_HELPERS_JS = """
+const COPY_XPATH = ".//*[contains(text(), 'コピー') or contains(text(), 'Copy')]";
+function visibleCopyCount(root) {
+  const s = document.evaluate(COPY_XPATH, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  let n = 0;
+  for (let i = 0; i < s.snapshotLength; i++) if (s.snapshotItem(i).offsetParent !== null) n++;
+  return n;
+}
+function followingSiblings(e, limit) {
+  const r = [];
+  for (let s = e.nextElementSibling; s && r.length < limit; s = s.nextElementSibling) r.push(s);
+  return r;
+}
+function hasCopyAfter(e) {
+  if (followingSiblings(e, 10).some(s => visibleCopyCount(s) > 0)) return true;
+  return !!e.parentElement && followingSiblings(e.parentElement, 5).some(s => visibleCopyCount(s) > 0);
+}
+"""
+
+# 表示中のコピーボタン数
+_COUNT_COPY_BUTTONS_JS = _COPY_BUTTON_HELPERS_JS + "return visibleCopyCount(document);"
+
+# 指定要素の後（兄弟要素・親要素の兄弟要素）にコピーボタンがあるか
+_COPY_AFTER_ELEMENT_JS = _COPY_BUTTON_HELPERS_JS + "return hasCopyAfter(arguments[0]);"
+
+# 指定要素の親要素（5階層まで）か次の兄弟要素（3つまで）にあるコピーボタン（[階層（兄弟要素は-1）, 個数]、なければnull）
+_COPY_NEAR_ELEMENT_JS = _COPY_BUTTON_HELPERS_JS + """
+const e = arguments[0];
+let p = e;
+for (let level = 0; level < 5 && p; level++, p = p.parentElement) {
+  const n = visibleCopyCount(p);
+  if (n) return [level, n];
+}
+for (const s of followingSiblings(e, 3)) {
+  const n = visibleCopyCount(s);
+  if (n) return [-1, n];
+}
+return null;
+"""
+
+# 指定文字列をテキストに含む表示中の要素のうち、後にコピーボタンがある最初の要素のテキスト（なければnull）
+# 文字列は引数で渡すため、引用符を含むプロンプトでもエスケープは不要
+_COPY_AFTER_PROMPT_JS = _COPY_BUTTON_HELPERS_JS + """
+const prompt = arguments[0];
+const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+const checked = new Set();
+for (let n = walker.nextNode(); n; n = walker.nextNode()) {
+  const e = n.parentElement;
+  if (!e || checked.has(e) || !n.nodeValue.includes(prompt)) continue;
+  checked.add(e);
+  if (e.offsetParent !== null && hasCopyAfter(e)) return (e.innerText || '').slice(0, 100);
+}
+return null;
+"""
+
+# ページの表示テキストに指定文字列が含まれるか
+_PROMPT_IN_PAGE_JS = "return document.body.innerText.includes(arguments[0]);"
+
+# ページ構造デバッグ用に、テキストを持つ要素のうち最新10個の情報を取得するスクリプト
+_PAGE_STRUCTURE_JS = """
+const snapshot = document.evaluate("//*[string-length(text()) > 20]", document, null,
+                                   XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const elements = [];
+for (let i = Math.max(0, snapshot.snapshotLength - 10); i < snapshot.snapshotLength; i++) {
+  const e = snapshot.snapshotItem(i);
+  const text = (e.innerText || '').trim();
+  elements.push([e.tagName.toLowerCase(), e.getAttribute('class') || '', e.id || '', text.slice(0, 100), text.length]);
+}
+return {url: location.href, title: document.title, count: snapshot.snapshotLength, elements: elements};
+"""
+
+# WebElementを一意に指すCSSセレクターを生成するスクリプト
+_STABLE_SELECTOR_JS = """
+const e = arguments[0];
+if (e.hasAttribute('message-content-id')) return "[message-content-id='" + e.getAttribute('message-content-id') + "']";
+if (e.id) return '#' + CSS.escape(e.id);
+if (!e.dataset.autoStreamId) e.dataset.autoStreamId = Date.now().toString(36) + Math.random().toString(36).slice(2);
+return "[data-auto-stream-id='" + e.dataset.autoStreamId + "']";
+"""
+
+# テキスト入力フィールドのセレクター（優先順）
+_TEXT_INPUT_SELECTORS = (
+    # 実際の構造に完全対応
+    "textarea[name='query'].search-input",
+    "textarea.search-input",
+    "textarea[name='query']",
+    "textarea[placeholder='Message']",
+    # フォールバック
+    "textarea",
+    "input[type='text']",
+    "[contenteditable='true']",
+)
+
+# textareaの兄弟要素から送信ボタンを探すXPath（一般的に送信ボタンはdivやbuttonタグで、特定のクラスやSVGを持つ）
+_SIBLING_SUBMIT_XPATHS = (
+    "./following-sibling::button",
+    "./following-sibling::div[contains(@class, 'send') or contains(@class, 'submit')]",
+    "./following-sibling::div//button",
+    "./following-sibling::*[//svg]",  # SVGを持つ兄弟要素
+)
+
+# 一般的な送信ボタンのセレクター
+_SUBMIT_BUTTON_SELECTORS = (
+    "button[type='submit']",
+    "button[aria-label*='Send']",  # アクセシビリティ属性
+    "button[aria-label*='送信']",
+    "input[type='submit']",
+    ".submit-button",
+    ".send-button",
+)
+
+# テキストベースの送信ボタン検索（テキスト, XPath）
+_SUBMIT_BUTTON_TEXT_XPATHS = tuple(
+    (text, f"//button[contains(text(), '{text}')]")
+    for text in ("送信", "生成", "実行", "Send", "Submit", "Generate", "Run", "Ask", "Chat")
+)
+
+# セレクター・テキストによる送信ボタン検索の優先順リスト（[種類, セレクター]）とログ用ラベル
+_SUBMIT_BUTTON_LOCATORS = (
+    tuple(["css", selector] for selector in _SUBMIT_BUTTON_SELECTORS)
+    + tuple(["xpath", xpath] for _, xpath in _SUBMIT_BUTTON_TEXT_XPATHS)
+)
+_SUBMIT_BUTTON_LOCATOR_LABELS = (
+    tuple(f"セレクター: {selector}" for selector in _SUBMIT_BUTTON_SELECTORS)
+    + tuple(f"テキスト: {text}" for text, _ in _SUBMIT_BUTTON_TEXT_XPATHS)
+)
+
+# 全ボタン検索時の送信系キーワード（小文字）
+_SUBMIT_KEYWORDS = ("send", "submit", "chat", "ask", "generate", "run", "送信", "生成", "実行")
+
+# エラーメッセージの検出XPath（「応答の生成中にエラーが発生しました」も「エラーが発生しました」に含まれる）
+_ERROR_MESSAGE_XPATH = (
+    "//*[contains(text(), 'エラーが発生しました')]"
+    " | //*[contains(concat(' ', normalize-space(@class), ' '), ' error-message ')"
+    " or contains(concat(' ', normalize-space(@class), ' '), ' alert-error ')]"
+)
+
+# 既存応答数のカウントに使うセレクター
+_RESPONSE_SELECTORS = (
+    ".thinking_prompt",
+    ".response_text",
+    ".assistant-message",
+    ".ai-response",
+    ".chat-response",
+)
+
+# 応答待ちポーリングの待機間隔（秒、変化がない間は順に延ばし、変化があれば先頭に戻す）
+_POLL_BACKOFF = (0.25, 0.5, 1.0, 1.5, 2.0)
+
+# 応答末尾のコピーボタンのテキスト（優先順、先に見つかったものだけを使う）
+_COPY_INDICATOR_PATTERNS = tuple(
+    (indicator, re.compile(re.escape(indicator))) for indicator in ("コピー", "Copy", "copy")
+)
+
+# 応答の末尾から除去するUI要素のテキスト
+_UNWANTED_PATTERNS = (
+    # ボタンテキスト
+    "再生成", "Regenerate", "いいね", "Like", "シェア", "Share",
+    # ナビゲーション要素
+    "次へ", "戻る", "Previous", "Next",
+    # UI要素
+    "メニュー", "Menu", "設定", "Settings",
+)
+_UNWANTED_PATTERN = re.compile("|".join(map(re.escape, _UNWANTED_PATTERNS)))
+
+# 応答候補から除外するエラーメッセージ（1回の走査で判定）
+_ERROR_TEXT_PATTERN = re.compile("応答の生成中にエラーが発生|再生成")
+
+# Thinking状態を示すクラス名（「thinking」または「thinking_prompt」等の派生クラス、「not-thinking」等は対象外）
+_THINKING_CLASS_PATTERN = re.compile(r"(?:^|\s)thinking(?:[_-][\w-]*)?(?=\s|$)", re.IGNORECASE)
+
+# Thinking状態を示すキーワード（小文字）
+_THINKING_INDICATORS = ("thinking", "█")
+
+# 応答Markdownのファイル名とヘッダーのテンプレート
+_OUTPUT_FILENAME_TEMPLATE = "output_%s_%03d.md"
+_MARKDOWN_HEADER_TEMPLATE = "# 自動取得結果 #%d\n\n**日時**: %s\n\n**プロンプト**: %s\n\n---\n\n"
+
+# 応答Markdownを書き込む際のos.openフラグ（WindowsではO_BINARYで改行変換を抑止）
+_OUTPUT_OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+# 継続処理を終了する入力
+_QUIT_COMMANDS = ('quit', 'exit', '終了', 'q')
+
+# 実行環境のプラットフォーム情報（起動ごとに取得し直さない）
+_PLATFORM_INFO = platform.uname()
+
+# Chrome実行ファイルの候補（プラットフォーム別）
+_CHROME_BINARIES = {
+    "Darwin": ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"],
+    "Linux": ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser"]
+}
+
+# --lean モードで追加するChrome起動オプション（画像やバックグラウンド通信を抑えてページ読み込みを軽くする）
+_LEAN_CHROME_ARGUMENTS = (
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--blink-settings=imagesEnabled=false",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-sync",
+    "--metrics-recording-disabled",
+    "--disable-features=Translate,OptimizationHints",
+)
+_LEAN_CHROME_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+# --lean モードでCDPにより遮断するURLパターン（広告・アクセス解析）
+_LEAN_BLOCKED_URLS = (
+    "*.doubleclick.net",
+    "*.google-analytics.com",
+    "*.googletagmanager.com",
+    "*.googlesyndication.com",
+)
+
+# 肥大化した場合に起動前に削除するプロファイル内のキャッシュ（Cookie・localStorageは残す）
+_VOLATILE_PROFILE_DIRS = (
+    "AutomationProfile/Cache",
+    "AutomationProfile/Code Cache",
+    "AutomationProfile/GPUCache",
+    "AutomationProfile/Service Worker/CacheStorage",
+)
+# キャッシュディレクトリごとの上限サイズ（これを超えた場合のみ起動前に削除する）
+_PROFILE_CACHE_LIMIT_BYTES = 512 * 1024 * 1024
+
+# --attach モードで接続するChromeのリモートデバッグアドレス
+_DEBUGGER_ADDRESS = "127.0.0.1:9222"
 
 
 class ChromeAutomationTool:
     """Chrome自動操作ツールクラス"""
 
-    def __init__(self, debug=True):
+    def __init__(self, debug=True, attach=False, lean=False, batch_output=None):
         """初期化"""
         self.driver = None
         self.wait = None
         self.debug = debug
+        self.attach = attach  # リモートデバッグポートで起動済みのChromeに接続するモード
+        self.lean = lean  # 画像読み込み等を無効化した軽量モード
+        # 指定時は応答を1つのJSONLファイルに追記する（ファイルは初回保存時に開く）
+        self.batch_output = Path(batch_output) if batch_output else None
+        self._batch_fp = None
         self.prompt_counter = 0  # プロンプトカウンター
         self.existing_response_count = 0  # プロンプト送信前の既存応答数
         self.existing_copy_button_count = 0  # プロンプト送信前の既存コピーボタン数
         self.current_retry_count = 0  # 現在のリトライ回数
         self.max_regenerate_retries = 5  # 最大リトライ回数
+        self._prompt_found_in_page = None  # ページ内で確認済みのプロンプト（一度表示されたプロンプトは消えないため再確認しない）
+        self.current_prompt_text = ""  # 現在送信中のプロンプト（設定時に検索用の先頭文字列も作成）
+        self._text_input = None  # 直前に見つけたテキスト入力フィールド（プロンプト間で再利用）
+        self._input_queue = None  # 標準入力の先読みキュー（継続処理の開始時に作成）
         self.original_user_prompt = ""  # ユーザーが最初に送信したプロンプト（フォールバック時の区別用）
         self.template_variables_file = "template_variables.json"  # テンプレート変数設定ファイル
+        self._output_dir = Path("outputs")  # 応答Markdownの保存先
+        self._output_dir_ready = False  # 保存先ディレクトリ作成済みフラグ
+        # Genspark.ai固有の生成中インジケーター（検索関数は一度だけ構築）
+        self._find_loading_indicator = _build_keyword_matcher(
+            ["thinking...", "thinking", "考え中", "生成中", "█"]
+        )
         self.setup_logging()
 
+    @property
+    def current_prompt_text(self):
+        """現在送信中のプロンプト"""
+        return self._current_prompt_text
+
+    @current_prompt_text.setter
+    def current_prompt_text(self, text):
+        self._current_prompt_text = text
+        # コピーボタン判定で毎回使う検索文字列（先頭50文字）は設定時に一度だけ作成
+        self._prompt_search_text = text[:50] if text else None
+
     def mask_text_for_debug(self, text, max_preview=6):
         """テキストをデバッグ用にマスキング（プライバシー保護強化）"""
         if not text:
@@ -141,19 +590,24 @@ class ChromeAutomationTool:
 
     def launch_chrome(self):
         """Chromeブラウザを起動"""
+        # ブラウザ起動時にしか使わないモジュールはここで読み込む
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+
         try:
-            # プラットフォーム情報を詳細にログ出力
-            system = platform.system()
-            machine = platform.machine()
-            release = platform.release()
-            version = platform.version()
-
-            self.logger.info(f"=== プラットフォーム情報 ===")
-            self.logger.info(f"システム: {system}")
-            self.logger.info(f"アーキテクチャ: {machine}")
-            self.logger.info(f"リリース: {release}")
-            self.logger.info(f"バージョン: {version}")
-            self.logger.info(f"Pythonバージョン: {platform.python_version()}")
+            # プラットフォーム情報はモジュール読み込み時に取得済みのものを使う
+            system, machine, release, version = (
+                _PLATFORM_INFO.system, _PLATFORM_INFO.machine, _PLATFORM_INFO.release, _PLATFORM_INFO.version
+            )
+
+            if self.debug:
+                self.logger.debug(f"=== プラットフォーム情報 ===")
+                self.logger.debug(f"システム: {system}")
+                self.logger.debug(f"アーキテクチャ: {machine}")
+                self.logger.debug(f"リリース: {release}")
+                self.logger.debug(f"バージョン: {version}")
+                self.logger.debug(f"Pythonバージョン: {platform.python_version()}")
 
             chrome_options = Options()
             chrome_options.add_argument("--disable-blink-features=AutomationControlled")
@@ -172,125 +626,313 @@ class ChromeAutomationTool:
             self.logger.info(f"Chromeプロファイルディレクトリ: {profile_dir}")
             self.logger.info("ログイン状態は次回起動時も保持されます")
 
-            # webdriver-managerのバージョンを確認
-            try:
-                import webdriver_manager
-                self.logger.info(f"webdriver-manager バージョン: {webdriver_manager.__version__}")
-            except:
-                self.logger.warning("webdriver-managerバージョンが取得できませんでした")
 
-            # ChromeDriverのパスを取得（手動インストール優先）
-            chrome_driver_path = None
+            #self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            print('===Profile-PATH===')
+            print(profile_dir)
+            if self.attach and (self.is_debugger_available() or self.start_debuggable_chrome(profile_dir)):
+                # 起動済みChromeに接続（ブラウザ起動・プロファイル読み込みを省略）
+                # ChromeDriverのパスはこのモードでしか使わないため、ここでのみ解決する
+                # （通常モードのundetected_chromedriverは自身でドライバーを用意する）
+                service = Service(self.resolve_chromedriver_path(profile_dir, system, machine))
+                self.logger.info(f"起動済みのChromeに接続します: {_DEBUGGER_ADDRESS}")
+                chrome_options = Options()
+                chrome_options.add_experimental_option("debuggerAddress", _DEBUGGER_ADDRESS)
+                self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            else:
+                self.prune_profile_cache(profile_dir)
+                chrome_options = Options()
+
+                # ユーザープロファイルディレクトリを設定してログイン状態を保持
+                chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+                chrome_options.add_argument("--profile-directory=AutomationProfile")
+                if self.lean:
+                    self.logger.info("軽量モード: 画像読み込みとバックグラウンド通信を無効化します")
+                    for argument in _LEAN_CHROME_ARGUMENTS:
+                        chrome_options.add_argument(argument)
+                    chrome_options.add_experimental_option("prefs", _LEAN_CHROME_PREFS)
+                import undetected_chromedriver as uc
+                self.driver = uc.Chrome(
+                    use_subprocess=False, options=chrome_options
+                )
+            #self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
 
-            # 1. 手動インストールされたChromeDriverを確認
-            manual_paths = [
-                "/usr/local/bin/chromedriver",
-                "/opt/homebrew/bin/chromedriver",
-                "/usr/bin/chromedriver"
-            ]
+            if self.lean:
+                # 広告・アクセス解析のリクエストをブラウザ側で遮断する
+                try:
+                    self.driver.execute_cdp_cmd("Network.enable", {})
+                    self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(_LEAN_BLOCKED_URLS)})
+                    self.logger.info(f"軽量モード: {len(_LEAN_BLOCKED_URLS)}件のURLパターンを遮断します")
+                except Exception as e:
+                    self.logger.warning(f"URL遮断の設定に失敗しました: {e}")
 
+            self.enlarge_connection_pool()
+            # 待機はすべて操作ごとの明示的待機で行うため、暗黙的待機は無効にしておく
+            self.driver.implicitly_wait(0)
+            self.wait = WebDriverWait(self.driver, 10, poll_frequency=0.2)
+
+            # 自動的にGenspark.aiのチャットページを開く
+            target_url = "https://www.genspark.ai/agents?type=moa_chat"
+            if self.attach and self.driver.current_url.startswith(target_url.split("/agents")[0]):
+                self.logger.info(f"既にGenspark.aiを開いているためページ遷移を省略します: {self.driver.current_url}")
+            else:
+                self.logger.info(f"Genspark.aiチャットページを開いています: {target_url}")
+                self.driver.get(target_url)
+
+            self.logger.info("Chromeブラウザを起動しました")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Chromeブラウザの起動に失敗: {e}")
+            self.logger.error(f"エラータイプ: {type(e).__name__}")
+            import traceback
+            self.logger.error(f"詳細なエラー情報:\n{traceback.format_exc()}")
+            return False
+
+    def enlarge_connection_pool(self, maxsize=10):
+        """WebDriverとの通信に使うHTTP接続プールを拡張（別スレッドからの同時コマンドを待たせない）"""
+        try:
+            pool_manager = self.driver.command_executor._conn
+            pool_manager.connection_pool_kw["maxsize"] = maxsize
+            pool_manager.clear()  # 既存のプールを破棄し、次のコマンドから新しいサイズで作り直す
+            self.logger.debug(f"WebDriver接続プールのサイズを{maxsize}に設定しました")
+        except AttributeError as e:
+            self.logger.debug(f"WebDriver接続プールの設定をスキップ: {e}")
+
+    def resolve_chromedriver_path(self, profile_dir, system, machine):
+        """接続モードで使うChromeDriverのパスを取得（キャッシュ → 手動インストール → webdriver-managerの順）"""
+        driver_cache_file = profile_dir / "driver_cache.json"
+        driver_cache_key = f"{system}-{machine}"
+        chrome_version = self.get_chrome_major_version()
+        chrome_driver_path = self._load_driver_cache(driver_cache_file, driver_cache_key, chrome_version)
+        driver_path_from_cache = chrome_driver_path is not None
+
+        # 1. 手動インストールされたChromeDriverを確認
+        manual_paths = [
+            "/usr/local/bin/chromedriver",
+            "/opt/homebrew/bin/chromedriver",
+            "/usr/bin/chromedriver"
+        ]
+
+        if not chrome_driver_path:
             for path in manual_paths:
                 if os.path.exists(path) and os.access(path, os.X_OK):
                     chrome_driver_path = path
                     self.logger.info(f"手動インストールされたChromeDriverを使用: {chrome_driver_path}")
                     break
 
-            # 2. 手動インストールが見つからない場合はwebdriver-managerを使用
-            if not chrome_driver_path:
-                self.logger.info("ChromeDriverをダウンロード中...")
-
-                try:
-                    # 新しいバージョンのwebdriver-managerを試す
-                    if system == "Darwin" and machine == "arm64":
-                        self.logger.info("Mac M1/M2用のChromeDriverを取得します")
-                        chrome_driver_path = ChromeDriverManager(os_type="mac-arm64").install()
-                    elif system == "Darwin":
-                        self.logger.info("Intel Mac用のChromeDriverを取得します")
-                        chrome_driver_path = ChromeDriverManager(os_type="mac64").install()
-                    elif system == "Linux":
-                        self.logger.info("Linux用のChromeDriverを取得します")
-                        chrome_driver_path = ChromeDriverManager(os_type="linux64").install()
-                    else:
-                        self.logger.info("自動検出でChromeDriverを取得します")
-                        chrome_driver_path = ChromeDriverManager().install()
+        # 2. 手動インストールが見つからない場合はwebdriver-managerを使用
+        if not chrome_driver_path:
+            self.logger.info("ChromeDriverをダウンロード中...")
+            from webdriver_manager.chrome import ChromeDriverManager  # ダウンロードが必要な場合のみ読み込む
+            # webdriver-managerのバージョンもダウンロード時のみ確認する
+            try:
+                import webdriver_manager
+                self.logger.info(f"webdriver-manager バージョン: {webdriver_manager.__version__}")
+            except:
+                self.logger.warning("webdriver-managerバージョンが取得できませんでした")
 
-                except TypeError as e:
-                    # 古いバージョンのwebdriver-managerの場合
-                    self.logger.warning(f"os_typeパラメータが使用できません: {e}")
-                    self.logger.info("互換性モードでChromeDriverを取得します")
+            try:
+                # 新しいバージョンのwebdriver-managerを試す
+                if system == "Darwin" and machine == "arm64":
+                    self.logger.info("Mac M1/M2用のChromeDriverを取得します")
+                    chrome_driver_path = ChromeDriverManager(os_type="mac-arm64").install()
+                elif system == "Darwin":
+                    self.logger.info("Intel Mac用のChromeDriverを取得します")
+                    chrome_driver_path = ChromeDriverManager(os_type="mac64").install()
+                elif system == "Linux":
+                    self.logger.info("Linux用のChromeDriverを取得します")
+                    chrome_driver_path = ChromeDriverManager(os_type="linux64").install()
+                else:
+                    self.logger.info("自動検出でChromeDriverを取得します")
                     chrome_driver_path = ChromeDriverManager().install()
 
-            self.logger.info(f"ChromeDriverManagerが返したパス: {chrome_driver_path}")
+            except TypeError as e:
+                # 古いバージョンのwebdriver-managerの場合
+                self.logger.warning(f"os_typeパラメータが使用できません: {e}")
+                self.logger.info("互換性モードでChromeDriverを取得します")
+                chrome_driver_path = ChromeDriverManager().install()
+
+        self.logger.info(f"ChromeDriverManagerが返したパス: {chrome_driver_path}")
+
+        # ChromeDriverの実際の実行ファイルパスを探す
+
+        driver_path = Path(chrome_driver_path)
+        self.logger.info(f"パスの詳細: {driver_path}")
+        self.logger.info(f"ファイルが存在: {driver_path.exists()}")
+        self.logger.info(f"実行可能: {os.access(driver_path, os.X_OK)}")
+
+        # 正しいChromeDriver実行ファイルを探す
+        if driver_path.name == "THIRD_PARTY_NOTICES.chromedriver" or not os.access(driver_path, os.X_OK):
+            # 親ディレクトリでchromedriver実行ファイルを探す
+            parent_dir = driver_path.parent
+            self.logger.info(f"親ディレクトリを検索: {parent_dir}")
+
+            # webdriver-managerのキャッシュ構成は決まっているため、想定パスを直接確認する
+            # （.wdm/drivers/chromedriver/<os>/<ver>/chromedriver-<plat>/chromedriver）
+            if system == "Darwin":
+                driver_platform = "mac-arm64" if machine == "arm64" else "mac-x64"
+            elif system == "Windows":
+                driver_platform = "win64" if machine.endswith("64") else "win32"
+            else:
+                driver_platform = "linux64"
+            driver_name = "chromedriver.exe" if system == "Windows" else "chromedriver"
+            candidates = [
+                parent_dir / f"chromedriver-{driver_platform}" / driver_name,
+                parent_dir / driver_name,
+                parent_dir.parent / driver_name
+            ]
+            actual_driver_path = None
 
-            # ChromeDriverの実際の実行ファイルパスを探す
+            for candidate in candidates:
+                self.logger.debug(f"候補ファイルをチェック: {candidate}")
+                if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+                    actual_driver_path = candidate
+                    self.logger.info(f"実行可能なChromeDriverを発見: {actual_driver_path}")
+                    break
 
-            driver_path = Path(chrome_driver_path)
-            self.logger.info(f"パスの詳細: {driver_path}")
-            self.logger.info(f"ファイルが存在: {driver_path.exists()}")
-            self.logger.info(f"実行可能: {os.access(driver_path, os.X_OK)}")
+            if actual_driver_path:
+                chrome_driver_path = str(actual_driver_path)
+            else:
+                # 深さ2までに限定して検索（キャッシュ全体の再帰走査は行わない）
+                self.logger.info("ChromeDriverを検索中（深さ2まで）...")
+                found_path = self._scan_for_driver(parent_dir, depth=2)
+                if found_path:
+                    chrome_driver_path = found_path
+                    self.logger.info(f"検索で発見: {chrome_driver_path}")
+
+        self.logger.info(f"最終的なChromeDriverパス: {chrome_driver_path}")
+        if not driver_path_from_cache:
+            self._save_driver_cache(driver_cache_file, driver_cache_key, chrome_version, chrome_driver_path)
+        return chrome_driver_path
+
+    def get_chrome_major_version(self):
+        """インストール済みChromeのメジャーバージョンを取得（取得できない場合はNone）"""
+        for binary in _CHROME_BINARIES.get(_PLATFORM_INFO.system, []):
+            try:
+                output = subprocess.check_output([binary, "--version"], stderr=subprocess.DEVNULL, timeout=5)
+            except (OSError, subprocess.SubprocessError):
+                continue
+            match = re.search(r"(\d+)\.", output.decode(errors="ignore"))
+            if match:
+                return match.group(1)
+        return None
 
-            # 正しいChromeDriver実行ファイルを探す
-            if driver_path.name == "THIRD_PARTY_NOTICES.chromedriver" or not os.access(driver_path, os.X_OK):
-                # 親ディレクトリでchromedriver実行ファイルを探す
-                parent_dir = driver_path.parent
-                self.logger.info(f"親ディレクトリを検索: {parent_dir}")
+    def is_debugger_available(self, timeout=0.2):
+        """リモートデバッグポートで待ち受けているChromeがあるか確認"""
+        try:
+            with urllib.request.urlopen(f"http://{_DEBUGGER_ADDRESS}/json/version", timeout=timeout) as response:
+                return response.status == 200
+        except (OSError, ValueError):
+            return False
 
-                possible_names = ["chromedriver", "chromedriver.exe"]
-                actual_driver_path = None
+    def start_debuggable_chrome(self, profile_dir):
+        """リモートデバッグポート付きのChromeを独立プロセスとして起動（次回以降も接続して再利用する）"""
+        binary = next(filter(None, map(shutil.which, _CHROME_BINARIES.get(_PLATFORM_INFO.system, []))), None)
+        if not binary:
+            self.logger.warning("Chromeの実行ファイルが見つからないため、通常の起動に切り替えます")
+            return False
 
-                for name in possible_names:
-                    candidate = parent_dir / name
-                    self.logger.info(f"候補ファイルをチェック: {candidate}")
-                    if candidate.exists() and os.access(candidate, os.X_OK):
-                        actual_driver_path = candidate
-                        self.logger.info(f"実行可能なChromeDriverを発見: {actual_driver_path}")
-                        break
+        self.prune_profile_cache(profile_dir)
+        debug_port = _DEBUGGER_ADDRESS.rsplit(":", 1)[1]
+        self.logger.info(f"リモートデバッグポート付きでChromeを起動します: {binary} (port={debug_port})")
+        subprocess.Popen(
+            [binary, f"--remote-debugging-port={debug_port}", f"--user-data-dir={profile_dir}",
+             "--profile-directory=AutomationProfile", *(_LEAN_CHROME_ARGUMENTS if self.lean else ())],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
 
-                if actual_driver_path:
-                    chrome_driver_path = str(actual_driver_path)
-                else:
-                    # 再帰的に検索
-                    self.logger.info("再帰的にChromeDriverを検索中...")
-                    for file_path in parent_dir.rglob("chromedriver*"):
-                        if file_path.is_file() and os.access(file_path, os.X_OK):
-                            if "THIRD_PARTY" not in file_path.name:
-                                chrome_driver_path = str(file_path)
-                                self.logger.info(f"再帰検索で発見: {chrome_driver_path}")
-                                break
-
-            self.logger.info(f"最終的なChromeDriverパス: {chrome_driver_path}")
-
-            service = Service(chrome_driver_path)
-            #self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            print('===Profile-PATH===')
-            print(profile_dir)
-            chrome_options = Options()
+        # デバッグポートが応答するまで待機（最大10秒）
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if self.is_debugger_available():
+                return True
+            time.sleep(0.2)
+        self.logger.warning("Chromeのデバッグポートが応答しないため、通常の起動に切り替えます")
+        return False
 
-            # ユーザープロファイルディレクトリを設定してログイン状態を保持
-            chrome_options.add_argument(f"--user-data-dir={profile_dir}")
-            chrome_options.add_argument("--profile-directory=AutomationProfile")
-            import undetected_chromedriver as uc
-            self.driver = uc.Chrome(
-                use_subprocess=False, options=chrome_options
-            )
-            #self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    def prune_profile_cache(self, profile_dir):
+        """プロファイル内のキャッシュディレクトリのうち上限サイズを超えたものだけ削除（通常はキャッシュを残して起動を速くする）"""
+        for relative_path in _VOLATILE_PROFILE_DIRS:
+            cache_dir = profile_dir / relative_path
+            if cache_dir.is_dir() and self._dir_size_exceeds(cache_dir, _PROFILE_CACHE_LIMIT_BYTES):
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                self.logger.info(f"上限サイズを超えたプロファイルキャッシュを削除: {cache_dir}")
+
+    def _dir_size_exceeds(self, root, limit):
+        """root以下のファイルサイズ合計がlimitバイトを超えるか（超えた時点で走査を打ち切る）"""
+        total = 0
+        stack = [root]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+                        if total > limit:
+                            return True
+                except OSError:
+                    continue
+        return False
 
-            self.wait = WebDriverWait(self.driver, 10)
+    def _scan_for_driver(self, root, depth=2):
+        """root以下（depth階層まで）から実行可能なchromedriverを探す"""
+        try:
+            entries = list(os.scandir(root))
+        except OSError:
+            return None
 
-            # 自動的にGenspark.aiのチャットページを開く
-            target_url = "https://www.genspark.ai/agents?type=moa_chat"
-            self.logger.info(f"Genspark.aiチャットページを開いています: {target_url}")
-            self.driver.get(target_url)
+        for entry in entries:
+            if (entry.name.startswith("chromedriver") and "THIRD_PARTY" not in entry.name
+                    and entry.is_file() and os.access(entry.path, os.X_OK)):
+                return entry.path
+        if depth > 1:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    found_path = self._scan_for_driver(entry.path, depth - 1)
+                    if found_path:
+                        return found_path
+        return None
 
-            self.logger.info("Chromeブラウザを起動しました")
-            return True
+    def _load_driver_cache(self, cache_file, cache_key, chrome_version):
+        """キャッシュ済みのChromeDriverパスを読み込む（無効な場合はNone）"""
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                entry = json.load(f).get(cache_key)
+        except (OSError, ValueError):
+            return None
 
-        except Exception as e:
-            self.logger.error(f"Chromeブラウザの起動に失敗: {e}")
-            self.logger.error(f"エラータイプ: {type(e).__name__}")
-            import traceback
-            self.logger.error(f"詳細なエラー情報:\n{traceback.format_exc()}")
-            return False
+        if not entry or entry.get("chrome_version") != chrome_version:
+            self.logger.debug("ChromeDriverキャッシュなし、またはChromeのバージョンが変わっています")
+            return None
+
+        path = entry.get("path")
+        if path and os.path.isfile(path) and os.access(path, os.X_OK):
+            self.logger.info(f"キャッシュ済みのChromeDriverを使用: {path}")
+            return path
+        return None
+
+    def _save_driver_cache(self, cache_file, cache_key, chrome_version, driver_path):
+        """解決したChromeDriverパスをキャッシュに保存"""
+        if not driver_path or not os.path.isfile(driver_path) or not os.access(driver_path, os.X_OK):
+            return
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        cache[cache_key] = {"path": str(driver_path), "chrome_version": chrome_version}
+        try:
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False, indent=2)
+            self.logger.debug(f"ChromeDriverパスをキャッシュしました: {cache_file}")
+        except OSError as e:
+            self.logger.warning(f"ChromeDriverキャッシュの保存に失敗: {e}")
 
     def wait_for_user_navigation(self):
         """ユーザーがページの準備完了を確認するまで待機"""
@@ -303,25 +945,26 @@ class ChromeAutomationTool:
 
     def find_text_input(self):
         """テキスト入力フィールドを探す（実際の構造に基づく）"""
-        selectors = [
-            # 実際の構造に完全対応
-            "textarea[name='query'].search-input",
-            "textarea.search-input",
-            "textarea[name='query']",
-            "textarea[placeholder='Message']",
-            # フォールバック
-            "textarea",
-            "input[type='text']",
-            "[contenteditable='true']"
-        ]
-
-        for selector in selectors:
+        # 前回見つけた入力フィールドがまだ有効ならそのまま使う（セッション中は通常変わらない）
+        if self._text_input is not None:
             try:
-                element = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-                self.logger.debug(f"テキスト入力フィールドを発見: {selector}")
-                return element
-            except TimeoutException:
-                continue
+                if self._text_input.is_displayed():
+                    return self._text_input
+            except StaleElementReferenceException:
+                self.logger.debug("キャッシュ済みのテキスト入力フィールドが無効になったため再検索します")
+            self._text_input = None
+
+        # 全セレクターを優先順に0.2秒間隔で試し、いずれかが見つかった時点で返す
+        # （セレクターごとに最大10秒待つのではなく、合計で最大10秒）
+        try:
+            element, selector = WebDriverWait(self.driver, 10, poll_frequency=0.2).until(
+                lambda d: d.execute_script(_FIND_FIRST_PRESENT_JS, _TEXT_INPUT_SELECTORS)
+            )
+            self.logger.debug(f"テキスト入力フィールドを発見: {selector}")
+            self._text_input = element
+            return element
+        except TimeoutException:
+            pass
 
         self.logger.warning("テキスト入力フィールドが見つかりません")
         return None
@@ -329,6 +972,8 @@ class ChromeAutomationTool:
     def find_submit_button(self):
         """送信ボタンを探す（デバッグ強化版）"""
         self.logger.info("=== 送信ボタン検索開始 ===")
+        # outerHTMLはDEBUGログにしか使わないため、DEBUG出力時のみブラウザから受け取る
+        with_html = self.logger.isEnabledFor(logging.DEBUG)
 
         # --- 新しい戦略：textareaを基準に探す ---
         try:
@@ -337,99 +982,40 @@ class ChromeAutomationTool:
             if text_input:
                 self.logger.info("テキスト入力フィールドを基準に送信ボタンを検索します")
 
-                # 親要素をいくつか遡りながら、その中にボタンがないか探す
-                parent = text_input
-                for i in range(3): # 3階層上まで見る
-                    # 兄弟要素にボタンがないか探す (SVGアイコンなどを含む)
-                    # 一般的に送信ボタンはdivやbuttonタグで、特定のクラスやSVGを持つ
-                    sibling_selectors = [
-                        "./following-sibling::button",
-                        "./following-sibling::div[contains(@class, 'send') or contains(@class, 'submit')]",
-                        "./following-sibling::div//button",
-                        "./following-sibling::*[//svg]" # SVGを持つ兄弟要素
-                    ]
-                    for selector in sibling_selectors:
-                        try:
-                            sibling_button = parent.find_element(By.XPATH, selector)
-                            if sibling_button.is_displayed() and sibling_button.is_enabled():
-                                outer_html = sibling_button.get_attribute('outerHTML')
-                                self.logger.info(f"✓ textareaの兄弟要素として送信ボタンを発見 (セレクター: {selector})")
-                                self.logger.debug(f"  [HTML]: {outer_html}")
-                                return sibling_button
-                        except NoSuchElementException:
-                            continue
-
-                    # 親要素に移動
-                    parent = parent.find_element(By.XPATH, "..")
+                # 親要素を3階層上まで遡りながら兄弟要素のボタン（SVGアイコンなどを含む）を探す
+                # 要素ごとの表示・有効判定を含めてブラウザ側で1回のexecute_scriptで行う
+                match = self.driver.execute_script(_FIND_SIBLING_SUBMIT_JS, text_input, _SIBLING_SUBMIT_XPATHS, 3, with_html)
+                if match:
+                    sibling_button, selector, outer_html = match
+                    self.logger.info(f"✓ textareaの兄弟要素として送信ボタンを発見 (セレクター: {selector})")
+                    self.logger.debug(f"  [HTML]: {outer_html}")
+                    return sibling_button
 
         except Exception as e:
             self.logger.error(f"textarea基準のボタン検索でエラー: {e}")
 
         self.logger.info("--- 従来の検索方法にフォールバック ---")
 
-        # 一般的なボタンセレクター
-        selectors = [
-            "button[type='submit']",
-            "button[aria-label*='Send']", # アクセシビリティ属性
-            "button[aria-label*='送信']",
-            "input[type='submit']",
-            ".submit-button",
-            ".send-button"
-        ]
-
-        # テキストベースのボタン検索
-        text_searches = [
-            "送信", "生成", "実行", "Send", "Submit", "Generate", "Run", "Ask", "Chat"
-        ]
-
-        # まず一般的なセレクターを試す
-        for selector in selectors:
-            try:
-                element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                if element.is_displayed() and element.is_enabled():
-                    outer_html = element.get_attribute('outerHTML')
-                    self.logger.info(f"✓ 送信ボタンを発見 (セレクター: {selector})")
-                    self.logger.debug(f"  [HTML]: {outer_html}")
-                    return element
-            except NoSuchElementException:
-                continue
-
-        # テキストベースで検索
-        for text in text_searches:
-            try:
-                element = self.driver.find_element(By.XPATH, f"//button[contains(text(), '{text}')]")
-                if element.is_displayed() and element.is_enabled():
-                    outer_html = element.get_attribute('outerHTML')
-                    self.logger.info(f"✓ 送信ボタンを発見 (テキスト: {text})")
-                    self.logger.debug(f"  [HTML]: {outer_html}")
-                    return element
-            except NoSuchElementException:
-                continue
+        # 一般的なセレクター、次にテキストベースの順で、最初の一致要素が表示中・有効かを1回のexecute_scriptでチェック
+        try:
+            match = self.driver.execute_script(_FIND_FIRST_USABLE_JS, _SUBMIT_BUTTON_LOCATORS, with_html)
+            if match:
+                element, index, outer_html = match
+                self.logger.info(f"✓ 送信ボタンを発見 ({_SUBMIT_BUTTON_LOCATOR_LABELS[index]})")
+                self.logger.debug(f"  [HTML]: {outer_html}")
+                return element
+        except Exception as e:
+            self.logger.debug(f"セレクターによる送信ボタン検索エラー: {e}")
 
-        # より広範囲な検索 - すべてのボタンをチェック
+        # より広範囲な検索 - すべてのボタンをブラウザ側で1回のexecute_scriptでチェック
         try:
             self.logger.info("すべてのボタンを検索して適切なものを探します...")
-            buttons = self.driver.find_elements(By.TAG_NAME, "button")
-            for button in buttons:
-                if not (button.is_displayed() and button.is_enabled()):
-                    continue
-
-                button_text = button.text.strip().lower()
-                button_classes = button.get_attribute("class") or ""
-                button_id = button.get_attribute("id") or ""
-
-                # ボタンの詳細をログ出力
-                self.logger.debug(f"ボタン発見 - テキスト: '{button_text}', クラス: '{button_classes}', ID: '{button_id}'")
-
-                # 送信系のキーワードをチェック
-                submit_keywords = ["send", "submit", "chat", "ask", "generate", "run", "送信", "生成", "実行"]
-                if any(keyword in button_text for keyword in submit_keywords) or \
-                   any(keyword in button_classes.lower() for keyword in submit_keywords) or \
-                   any(keyword in button_id.lower() for keyword in submit_keywords):
-                    outer_html = button.get_attribute('outerHTML')
-                    self.logger.info(f"✓ 適切な送信ボタンを発見: テキスト='{button_text}', クラス='{button_classes}'")
-                    self.logger.debug(f"  [HTML]: {outer_html}")
-                    return button
+            match = self.driver.execute_script(_FIND_SUBMIT_BUTTON_JS, _SUBMIT_KEYWORDS, with_html)
+            if match:
+                button, button_text, button_classes, outer_html = match
+                self.logger.info(f"✓ 適切な送信ボタンを発見: テキスト='{button_text}', クラス='{button_classes}'")
+                self.logger.debug(f"  [HTML]: {outer_html}")
+                return button
 
             # Enterキーでの送信を試すため、Noneではなく代替手段を提供
             self.logger.warning("明確な送信ボタンが見つかりません。Enterキー送信を試します。")
@@ -446,50 +1032,27 @@ class ChromeAutomationTool:
         try:
             self.logger.info("=== ページ構造デバッグ ===")
 
-            # ページタイトルとURL
-            self.logger.info(f"URL: {self.driver.current_url}")
-            self.logger.info(f"タイトル: {self.driver.title}")
-
-            # 最近追加された要素（テキストを持つ）
-            elements_with_text = self.driver.find_elements(By.XPATH, "//*[string-length(text()) > 20]")
-            self.logger.info(f"テキストを持つ要素数: {len(elements_with_text)}")
+            # URL・タイトル・テキストを持つ要素の情報を1回のexecute_scriptでまとめて取得
+            page_info = self.driver.execute_script(_PAGE_STRUCTURE_JS)
+            self.logger.info(f"URL: {page_info['url']}")
+            self.logger.info(f"タイトル: {page_info['title']}")
+            self.logger.info(f"テキストを持つ要素数: {page_info['count']}")
 
             # 最新の10個の要素を表示
-            for i, element in enumerate(elements_with_text[-10:]):
-                try:
-                    tag = element.tag_name
-                    class_attr = element.get_attribute("class") or ""
-                    id_attr = element.get_attribute("id") or ""
-                    text_preview = element.text.strip()[:100] + "..." if len(element.text.strip()) > 100 else element.text.strip()
-
-                    self.logger.info(f"要素 {i+1}: <{tag}> class='{class_attr}' id='{id_attr}' テキスト='{text_preview}'")
-                except:
-                    continue
+            for i, (tag, class_attr, id_attr, text, text_length) in enumerate(page_info['elements']):
+                text_preview = text + "..." if text_length > 100 else text
+                self.logger.info(f"要素 {i+1}: <{tag}> class='{class_attr}' id='{id_attr}' テキスト='{text_preview}'")
 
         except Exception as e:
             self.logger.error(f"ページ構造デバッグエラー: {e}")
 
     def check_for_error_message(self):
         """エラーメッセージをチェック"""
-        error_selectors = [
-            "//*[contains(text(), '応答の生成中にエラーが発生しました')]",
-            "//*[contains(text(), 'エラーが発生しました')]",
-            ".error-message",
-            ".alert-error"
-        ]
-
-        for selector in error_selectors:
-            try:
-                if selector.startswith("//"):
-                    element = self.driver.find_element(By.XPATH, selector)
-                else:
-                    element = self.driver.find_element(By.CSS_SELECTOR, selector)
-
-                if element.is_displayed():
-                    self.logger.warning(f"エラーメッセージを検出: {element.text}")
-                    return True
-            except NoSuchElementException:
-                continue
+        # 全条件の検索と表示判定をブラウザ側で1回のexecute_scriptで行い、表示中の最初の要素のテキストを受け取る
+        error_text = self.driver.execute_script(_FIRST_VISIBLE_TEXT_JS, _ERROR_MESSAGE_XPATH)
+        if error_text is not None:
+            self.logger.warning(f"エラーメッセージを検出: {error_text}")
+            return True
 
         return False
 
@@ -507,21 +1070,22 @@ class ChromeAutomationTool:
         if not text:
             return False
 
-        thinking_indicators = ['thinking', '█']
         text_lower = text.lower()
 
-        matched_indicators = [indicator for indicator in thinking_indicators if indicator in text_lower]
+        matched_indicators = [indicator for indicator in _THINKING_INDICATORS if indicator in text_lower]
 
         if matched_indicators:
-            context_info = f"[{context}] " if context else ""
-            self.logger.info(f"{context_info}Thinking状態検出: マッチしたキーワード = {matched_indicators}")
+            # ポーリングの毎回呼ばれるため、DEBUG時のみ出力
+            if self.logger.isEnabledFor(logging.DEBUG):
+                context_info = f"[{context}] " if context else ""
+                self.logger.debug(f"{context_info}Thinking状態検出: マッチしたキーワード = {matched_indicators}")
             return True
         else:
             if context:
                 # ストリーミング待機時は詳細ログを出力
                 if context == "ストリーミング待機":
                     self.logger.info(f"[{context}] ✅ Thinking状態未検出: テキスト長={len(text)}文字")
-                    self.logger.info(f"[{context}] 検索対象キーワード: {thinking_indicators}")
+                    self.logger.info(f"[{context}] 検索対象キーワード: {list(_THINKING_INDICATORS)}")
                     self.logger.info(f"[{context}] テキスト内容: '{text[:100]}{'...' if len(text) > 100 else ''}'")
                 else:
                     self.logger.debug(f"[{context}] Thinking状態未検出")
@@ -537,30 +1101,22 @@ class ChromeAutomationTool:
         self.logger.info(f"=== 再生成ボタン検索開始 (呼び出し{self._regenerate_button_call_count}回目) ===")
 
         try:
-            # 軽量版と同じAND条件ロジックを使用
+            # 軽量版と同じAND条件ロジックを使用（1回のexecute_scriptで判定）
+            scan = self.scan_regenerate_button()
             # 条件1: 「応答を再生成」テキストを含むdiv要素
-            regenerate_divs = self.driver.find_elements(By.XPATH, "//div[contains(text(), '応答を再生成')]")
-            self.logger.info(f"条件1チェック: 「応答を再生成」テキストを含むdiv = {len(regenerate_divs)}個")
-
+            self.logger.info(f"条件1チェック: 「応答を再生成」テキストを含むdiv = {scan['regenerateCount']}個")
             # 条件2: div.buttonクラス要素
-            button_divs = self.driver.find_elements(By.CSS_SELECTOR, "div.button")
-            self.logger.info(f"条件2チェック: div.buttonクラス要素 = {len(button_divs)}個")
-
-            # AND条件: 両方の条件を満たす要素を探す
-            for regenerate_div in regenerate_divs:
-                if regenerate_div.is_displayed():
-                    for button_div in button_divs:
-                        if button_div.is_displayed() and regenerate_div == button_div:
-                            self.logger.info(f"✅ AND条件で再生成ボタン検出: 「応答を再生成」テキスト含むdiv.button要素")
-                            self.logger.info("=== 再生成ボタン検出終了（成功）===")
-                            return regenerate_div
+            self.logger.info(f"条件2チェック: div.buttonクラス要素 = {scan['buttonCount']}個")
 
-            # 個別条件での検出状況をログ出力
-            displayed_regenerate = [d for d in regenerate_divs if d.is_displayed()]
-            displayed_buttons = [d for d in button_divs if d.is_displayed()]
+            # AND条件: 両方の条件を満たす要素
+            if scan['button']:
+                self.logger.info(f"✅ AND条件で再生成ボタン検出: 「応答を再生成」テキスト含むdiv.button要素")
+                self.logger.info("=== 再生成ボタン検出終了（成功）===")
+                return scan['button']
 
-            self.logger.info(f"表示中の「応答を再生成」div: {len(displayed_regenerate)}個")
-            self.logger.info(f"表示中のdiv.button: {len(displayed_buttons)}個")
+            # 個別条件での検出状況をログ出力
+            self.logger.info(f"表示中の「応答を再生成」div: {scan['displayedRegenerateCount']}個")
+            self.logger.info(f"表示中のdiv.button: {scan['displayedButtonCount']}個")
             self.logger.info(f"AND条件を満たす要素: 0個")
 
         except Exception as e:
@@ -573,28 +1129,20 @@ class ChromeAutomationTool:
     def check_regenerate_button_lightweight(self):
         """軽量版再生成ボタンチェック（ストリーミング監視用）"""
         try:
+            scan = self.scan_regenerate_button()
             # 条件1: 「応答を再生成」テキストを含むdiv要素
-            regenerate_divs = self.driver.find_elements(By.XPATH, "//div[contains(text(), '応答を再生成')]")
-            self.logger.debug(f"条件1チェック: 「応答を再生成」テキストを含むdiv = {len(regenerate_divs)}個")
-
+            self.logger.debug(f"条件1チェック: 「応答を再生成」テキストを含むdiv = {scan['regenerateCount']}個")
             # 条件2: div.buttonクラス要素
-            button_divs = self.driver.find_elements(By.CSS_SELECTOR, "div.button")
-            self.logger.debug(f"条件2チェック: div.buttonクラス要素 = {len(button_divs)}個")
-
-            # AND条件: 両方の条件を満たす要素を探す
-            for regenerate_div in regenerate_divs:
-                if regenerate_div.is_displayed():
-                    for button_div in button_divs:
-                        if button_div.is_displayed() and regenerate_div == button_div:
-                            self.logger.info(f"✅ AND条件で再生成ボタン検出: 「応答を再生成」テキスト含むdiv.button要素")
-                            return True
+            self.logger.debug(f"条件2チェック: div.buttonクラス要素 = {scan['buttonCount']}個")
 
-            # 個別条件での検出状況をログ出力
-            displayed_regenerate = [d for d in regenerate_divs if d.is_displayed()]
-            displayed_buttons = [d for d in button_divs if d.is_displayed()]
+            # AND条件: 両方の条件を満たす要素
+            if scan['button']:
+                self.logger.info(f"✅ AND条件で再生成ボタン検出: 「応答を再生成」テキスト含むdiv.button要素")
+                return True
 
-            self.logger.debug(f"表示中の「応答を再生成」div: {len(displayed_regenerate)}個")
-            self.logger.debug(f"表示中のdiv.button: {len(displayed_buttons)}個")
+            # 個別条件での検出状況をログ出力
+            self.logger.debug(f"表示中の「応答を再生成」div: {scan['displayedRegenerateCount']}個")
+            self.logger.debug(f"表示中のdiv.button: {scan['displayedButtonCount']}個")
             self.logger.debug(f"AND条件を満たす要素: 0個")
 
             return False
@@ -602,6 +1150,10 @@ class ChromeAutomationTool:
             self.logger.debug(f"軽量版再生成ボタンチェックエラー: {e}")
             return False
 
+    def scan_regenerate_button(self):
+        """再生成ボタンのAND条件判定をブラウザ側でまとめて実行（1回のexecute_script）"""
+        return self.driver.execute_script(_SCAN_REGENERATE_BUTTON_JS)
+
     def handle_regenerate_with_retry(self, max_retries=5):
         """再生成ボタンの自動リトライ処理"""
         self.logger.info("=== 再生成ボタン自動リトライ処理開始 ===")
@@ -684,153 +1236,56 @@ class ChromeAutomationTool:
         max_checks = timeout // check_interval
         minimum_response_length = 50  # 最低限の応答長
 
-        # 要素を特定するための情報を保存
-        element_info = {
-            'tag': None,
-            'class': None,
-            'id': None,
-            'xpath': None
-        }
-
-        # 初回要素情報を取得
+        # 監視対象を安定したCSSセレクターに変換（ポーリング中は要素参照を保持しない）
+        stream_selectors = []
         try:
             if isinstance(response_element_selector, str):
                 # セレクター文字列が渡された場合
                 self.logger.debug(f"セレクターを使用: {response_element_selector}")
+                stream_selectors.append(response_element_selector)
+                # 同様のセレクターのバリエーションも試す
+                if '*' not in response_element_selector:  # 既にワイルドカードを含まない場合
+                    # クラス名やIDの部分マッチも試す
+                    if response_element_selector.startswith('.'):
+                        stream_selectors.append(f"[class*='{response_element_selector[1:]}']")
+                    elif response_element_selector.startswith('#'):
+                        stream_selectors.append(f"[id*='{response_element_selector[1:]}']")
             else:
-                # WebElement が渡された場合、情報を抽出
-                element = response_element_selector
-                element_info['tag'] = element.tag_name
-                element_info['class'] = element.get_attribute("class")
-                element_info['id'] = element.get_attribute("id")
-
-                # XPathを生成
-                try:
-                    element_info['xpath'] = self.driver.execute_script(
-                        "function getXPath(element) {"
-                        "  if (element.id !== '') return '//*[@id=\"" + element.id + "\"]';"
-                        "  if (element === document.body) return '/html/body';"
-                        "  var ix = 0;"
-                        "  var siblings = element.parentNode.childNodes;"
-                        "  for (var i = 0; i < siblings.length; i++) {"
-                        "    var sibling = siblings[i];"
-                        "    if (sibling === element) return getXPath(element.parentNode) + '/' + element.tagName.toLowerCase() + '[' + (ix + 1) + ']';"
-                        "    if (sibling.nodeType === 1 && sibling.tagName === element.tagName) ix++;"
-                        "  }"
-                        "}"
-                        "return getXPath(arguments[0]);", element
-                    )
-                except:
-                    element_info['xpath'] = None
-
-                self.logger.debug(f"要素情報: タグ={element_info['tag']}, ID={element_info['id']}, クラス={element_info['class']}")
+                # WebElement が渡された場合、要素を一意に指すセレクターをブラウザ側で生成
+                stream_selectors.append(self.driver.execute_script(_STABLE_SELECTOR_JS, response_element_selector))
+                self.logger.debug(f"要素から生成したセレクター: {stream_selectors[0]}")
         except Exception as e:
             self.logger.warning(f"初回要素情報取得エラー: {e}")
 
+        # 前回取得したテキストの長さと末尾（ブラウザ側での変化判定に使用）
+        last_signature = (-1, None)
+        backoff_index = 0  # 監視対象の出現待ちの待機間隔（_POLL_BACKOFFの位置）
+
         self.logger.info(f"最大 {max_checks} 回のチェックを開始（タイムアウト: {timeout}秒）")
 
         for i in range(max_checks):
-            self.logger.debug(f"ストリーミングチェック {i+1}/{max_checks}")
+            self.logger.debug("ストリーミングチェック %d/%d", i + 1, max_checks)
             try:
-                # 要素を再取得（Stale Element対策）
-                current_element = None
-
-                # 複数の方法で要素を再取得を試す
-                methods = []
-
-                if isinstance(response_element_selector, str):
-                    methods.append(('selector', response_element_selector))
-                    # 同様のセレクターのバリエーションも試す
-                    if '*' not in response_element_selector:  # 既にワイルドカードを含まない場合
-                        # クラス名やIDの部分マッチも試す
-                        if response_element_selector.startswith('.'):
-                            class_name = response_element_selector[1:]
-                            methods.append(('partial_class', f"[class*='{class_name}']"))
-                        elif response_element_selector.startswith('#'):
-                            id_name = response_element_selector[1:]
-                            methods.append(('partial_id', f"[id*='{id_name}']"))
-                else:
-                    if element_info['id']:
-                        methods.append(('id', element_info['id']))
-                    if element_info['xpath']:
-                        methods.append(('xpath', element_info['xpath']))
-                    if element_info['class']:
-                        methods.append(('class', element_info['class']))
-
-                for method_type, method_value in methods:
-                    try:
-                        if method_type == 'selector' or method_type == 'partial_class' or method_type == 'partial_id':
-                            elements = self.driver.find_elements(By.CSS_SELECTOR, method_value)
-                            if elements:
-                                # DOM順序で最後の要素（最新）を優先し、それがダメなら最もテキストが長いものを選択
-                                valid_elements = [e for e in elements if e.is_displayed() and len(e.text.strip()) > 0]
-                                if valid_elements:
-                                    # 最後の要素（最新）を選択
-                                    current_element = valid_elements[-1]
-                        elif method_type == 'id':
-                            current_element = self.driver.find_element(By.ID, method_value)
-                        elif method_type == 'xpath':
-                            current_element = self.driver.find_element(By.XPATH, method_value)
-                        elif method_type == 'class':
-                            elements = self.driver.find_elements(By.CLASS_NAME, method_value)
-                            if elements:
-                                # クラス名で複数見つかった場合は、テキストが最も長い要素を選択
-                                valid_elements = [e for e in elements if e.is_displayed() and len(e.text.strip()) > 0]
-                                if valid_elements:
-                                    current_element = max(valid_elements, key=lambda e: len(e.text.strip()))
-
-                        if current_element and current_element.is_displayed():
-                            break
-
-                    except Exception as method_error:
-                        self.logger.debug(f"要素再取得エラー ({method_type}: {method_value}): {method_error}")
-                        continue
-
-                if not current_element:
-                    # セレクターで見つからない場合は、message-content-id属性を直接検索
-                    self.logger.debug(f"チェック {i+1}: セレクター検索失敗、message-content-id属性による直接検索を実行中...")
-
-                    # response_element_selectorから ID を抽出
-                    target_id = None
-                    if isinstance(response_element_selector, str) and "message-content-id=" in response_element_selector:
-                        # "[message-content-id='11']" から '11' を抽出
-                        import re
-                        match = re.search(r"message-content-id='(\d+)'", response_element_selector)
-                        if match:
-                            target_id = match.group(1)
-
-                    if target_id:
-                        try:
-                            # 指定されたIDのmessage-content-id要素を直接検索
-                            specific_elements = self.driver.find_elements(By.CSS_SELECTOR, f"[message-content-id='{target_id}']")
-
-                            # 表示されている要素を選択
-                            for elem in specific_elements:
-                                if elem.is_displayed():
-                                    current_element = elem
-                                    self.logger.debug(f"message-content-id={target_id}の要素を発見: {len(elem.text.strip())}文字")
-                                    break
-
-                            if not current_element:
-                                self.logger.warning(f"チェック {i+1}: message-content-id={target_id}要素が表示されていません")
-                                time.sleep(check_interval)
-                                continue
-                        except Exception as specific_error:
-                            self.logger.debug(f"message-content-id検索エラー: {specific_error}")
-                            time.sleep(check_interval)
-                            continue
-                    else:
-                        self.logger.warning(f"チェック {i+1}: セレクターからIDを抽出できません: {response_element_selector}")
-                        time.sleep(check_interval)
-                        continue
+                # 1回のexecute_scriptで対象要素の状態を取得（テキスト本体は変化時のみ転送）
+                state = self.driver.execute_script(
+                    _STREAMING_STATE_JS, stream_selectors, last_signature[0], last_signature[1]
+                ) if stream_selectors else None
+
+                if not state:
+                    self.logger.warning(f"チェック {i+1}: 監視対象の要素が表示されていません: {response_element_selector}")
+                    time.sleep(min(_POLL_BACKOFF[backoff_index], check_interval))
+                    backoff_index = min(backoff_index + 1, len(_POLL_BACKOFF) - 1)
+                    continue
 
-                current_text = current_element.text.strip()
+                last_signature = (state['length'], state['tail'])
+                text_changed = state['text'] is not None
+                current_text = state['text'] if text_changed else previous_text
                 current_length = len(current_text)
 
-                self.logger.debug(f"チェック {i+1}/{max_checks}: テキスト長={current_length}文字")
+                self.logger.debug("チェック %d/%d: テキスト長=%d文字", i + 1, max_checks, current_length)
 
                 # 「応答を再生成」メッセージの検出（エラー状態）
-                if "応答を再生成" in current_text or "再生成" in current_text:
+                if "再生成" in current_text:  # 「応答を再生成」も含む
                     self.logger.warning(f"再生成メッセージを検出 - エラー状態: '{current_text[:100]}'")
                     self.logger.info(f"セレクター: {response_element_selector}, チェック回数: {i+1}/{max_checks}")
                     # エラー状態として特別なフラグを返す
@@ -854,65 +1309,25 @@ class ChromeAutomationTool:
                 except Exception as e:
                     self.logger.debug(f"プロンプト後コピーボタン検出エラー: {e}")
 
-                # Genspark.ai固有の生成中インジケーター検出
-                genspark_loading_indicators = [
-                    "thinking...", "thinking", "考え中", "生成中", "█"
-                ]
-
                 # 要素のclassをチェックしてthinking状態を検出
-                try:
-                    if hasattr(current_element, 'get_attribute'):
-                        element_classes = current_element.get_attribute("class") or ""
-                        if "thinking" in element_classes:
-                            is_still_generating = True
-                            self.logger.debug("要素のthinkingクラスを検出")
-                except:
-                    pass
-
-                # テキスト内とページ内での「Thinking...」検出
-                page_text = ""
-                try:
-                    page_text = self.driver.page_source.lower()
-                except:
-                    pass
-
-                for indicator in genspark_loading_indicators:
-                    # 現在のテキスト内でのチェック
-                    if indicator.lower() in current_text.lower():
-                        is_still_generating = True
-                        self.logger.debug(f"テキスト内生成中インジケーター検出: {indicator}")
-                        break
-
-                    # ページ内での「thinking」チェック（より限定的）
-                    if indicator == "thinking" and "thinking..." in page_text:
-                        # 「Thinking...」要素を具体的に検索
-                        try:
-                            thinking_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'Thinking') or contains(text(), 'thinking')]")
-                            visible_thinking = [elem for elem in thinking_elements if elem.is_displayed() and ("thinking" in elem.text.lower() or "█" in elem.text)]
-
-                            if visible_thinking:
-                                is_still_generating = True
-                                self.logger.debug("Thinking...インジケーターを検出")
-                                break
-                        except:
-                            pass
-
-                # ページソース全体でThinking関連の要素を再確認
-                try:
-                    if not is_still_generating: # 既に生成中と判定されていない場合のみ
-                        # Thinkingを示す要素をより広範囲に検索
-                        thinking_elements_broad = self.driver.find_elements(By.XPATH, "//*[contains(@class, 'thinking') or contains(text(), 'Thinking') or contains(text(), '考え中') or contains(text(), '生成中')]")
-                        visible_thinking_broad = [elem for elem in thinking_elements_broad if elem.is_displayed()]
-                        if visible_thinking_broad:
-                            is_still_generating = True
-                            self.logger.debug("広範囲なThinking要素を検出")
-                except Exception as e:
-                    self.logger.debug(f"広範囲Thinking要素検索エラー: {e}")
-
-                # 前回と同じテキストかチェック
-                if current_text == previous_text and current_length > 0:
+                if _THINKING_CLASS_PATTERN.search(state['classes']):
+                    is_still_generating = True
+                    self.logger.debug("要素のthinkingクラスを検出")
+
+                # 現在のテキスト内でのチェック（全インジケーターを一括検索）
+                indicator = self._find_loading_indicator(current_text)
+                if indicator:
+                    is_still_generating = True
+                    self.logger.debug("テキスト内生成中インジケーター検出: %s", indicator)
+                elif state['pageThinking']:
+                    # ページ内のThinking要素（同じexecute_scriptで判定済み）
+                    is_still_generating = True
+                    self.logger.debug("ページ内のThinking要素を検出")
+
+                # 前回と同じテキストかチェック（長さと末尾の比較結果を使用）
+                if not text_changed and current_length > 0:
                     stable_count += 1
-                    self.logger.debug(f"安定カウント: {stable_count}/{required_stable_count}")
+                    self.logger.debug("安定カウント: %d/%d", stable_count, required_stable_count)
 
                     # 完了判定（より厳密に）
                     if stable_count >= required_stable_count and not is_still_generating and current_length >= minimum_response_length:
@@ -928,14 +1343,14 @@ class ChromeAutomationTool:
                             self.logger.info(f"ストリーミング応答が完了しました（最終: {len(cleaned_text)}文字、コピーボタン: {copy_button_exists}）")
                             return cleaned_text
                         else:
-                            self.logger.debug(f"完了条件を満たしていません（長さ: {current_length}, コピーボタン: {copy_button_exists}）")
+                            self.logger.debug("完了条件を満たしていません（長さ: %d, コピーボタン: %s）", current_length, copy_button_exists)
                             stable_count = max(0, stable_count - 1)  # カウントを少し戻す
                 else:
                     # テキストが変化した場合はカウントをリセット
                     if current_length > 0:  # 空のテキストは無視
                         stable_count = 0
                         previous_text = current_text
-                        self.logger.debug(f"テキスト更新: {current_length}文字")
+                        self.logger.debug("テキスト更新: %d文字", current_length)
 
                 # インジケーター検出時の処理
                 if is_still_generating:
@@ -960,13 +1375,25 @@ class ChromeAutomationTool:
         self.logger.warning("再生成ボタンチェックのためNoneを返します")
         return None
 
+    def wait_for_copy_button_increase(self, timeout):
+        """表示中のコピーボタンが現在より増えるまで最大timeout秒待機（増えたらTrue）"""
+        try:
+            baseline = self.driver.execute_script(_COUNT_COPY_BUTTONS_JS)
+            WebDriverWait(self.driver, timeout, poll_frequency=0.5,
+                          ignored_exceptions=(StaleElementReferenceException,)).until(
+                lambda d: d.execute_script(_COUNT_COPY_BUTTONS_JS) > baseline
+            )
+            return True
+        except TimeoutException:
+            return False
+
     def wait_for_streaming_complete_v2(self, response_element_selector, timeout=300, check_interval=3):
         """ストリーミング応答完了待機の新実装（動的要素遷移対応）"""
         self.logger.info("新ストリーミング検出ロジックを開始...")
 
         start_time = time.time()
-        max_checks = 100
-        self.logger.info(f"最大 {max_checks} 回のチェックを開始（タイムアウト: {timeout}秒）")
+        self.logger.info(f"チェックを開始（タイムアウト: {timeout}秒）")
+        backoff_index = 0  # Thinking中・要素出現待ちの待機間隔（_POLL_BACKOFFの位置）
         stable_count = 0
         stable_threshold = 3
         previous_text = ""
@@ -974,12 +1401,10 @@ class ChromeAutomationTool:
         # 初期状態の記録（プロンプト送信直後の状態）
         initial_message_ids = set()
         try:
-            initial_elements = self.driver.find_elements(By.CSS_SELECTOR, "[message-content-id]")
-            for elem in initial_elements:
-                if elem.is_displayed():
-                    msg_id = elem.get_attribute("message-content-id")
-                    if msg_id:
-                        initial_message_ids.add(msg_id)
+            initial_message_ids = {
+                info['id'] for info in self.driver.execute_script(_MESSAGE_ELEMENTS_JS, False)
+                if info['displayed'] and info['id']
+            }
             self.logger.debug(f"初期状態のmessage-content-id: {sorted(initial_message_ids)}")
         except Exception as e:
             self.logger.warning(f"初期状態記録エラー: {e}")
@@ -995,37 +1420,39 @@ class ChromeAutomationTool:
 
         # 前回のテキスト内容を保存する変数
         previous_thinking_text = ""
+        announced_response_id = None  # 出現をログ出力済みの応答要素ID
+        thinking_settled = False  # Thinking終了後の出現待ちを済ませたか
 
-        for i in range(max_checks):
-            self.logger.debug(f"新ストリーミングチェック {i+1}/{max_checks}")
+        # 待機間隔が可変のため、回数ではなく経過時間で打ち切る
+        checks_done = 0
+        for i in itertools.count():
+            if time.time() - start_time >= timeout:
+                break
+            checks_done = i + 1
+            self.logger.debug("新ストリーミングチェック %d", i + 1)
             try:
                 # 🔄 最優先: 再生成ボタンチェック
-                self.logger.debug(f"チェック {i+1}: 再生成ボタンの優先チェックを実行中...")
+                self.logger.debug("チェック %d: 再生成ボタンの優先チェックを実行中...", i + 1)
                 regenerate_detected = self.check_regenerate_button_lightweight()
                 if regenerate_detected:
                     self.logger.warning(f"チェック {i+1}: 🚨 再生成ボタンを検出！即座にストリーミング監視を終了します")
                     self.logger.info("フォールバックメッセージ送信処理に移行します")
                     return "REGENERATE_ERROR_DETECTED"
                 else:
-                    self.logger.debug(f"チェック {i+1}: 再生成ボタンは未検出 - 通常の監視を継続")
-
-                # 現在のすべてのmessage-content-id要素を取得
-                current_elements = self.driver.find_elements(By.CSS_SELECTOR, "[message-content-id]")
-                valid_elements = []
-
-                for elem in current_elements:
-                    if elem.is_displayed():
-                        msg_id = elem.get_attribute("message-content-id")
-                        text = elem.text.strip()
-                        class_attr = elem.get_attribute('class') or ""
-                        if msg_id and text:
-                            valid_elements.append({
-                                'element': elem,
-                                'id': msg_id,
-                                'text': text,
-                                'length': len(text),
-                                'classes': class_attr
-                            })
+                    self.logger.debug("チェック %d: 再生成ボタンは未検出 - 通常の監視を継続", i + 1)
+
+                # 現在のすべてのmessage-content-id要素の情報を1回のexecute_scriptで取得
+                valid_elements = [
+                    {
+                        'element': info['element'],
+                        'id': info['id'],
+                        'text': info['text'],
+                        'length': len(info['text']),
+                        'classes': info['classes']
+                    }
+                    for info in self.driver.execute_script(_MESSAGE_ELEMENTS_JS, False)
+                    if info['displayed'] and info['id'] and info['text']
+                ]
 
                 if not valid_elements:
                     self.logger.warning(f"チェック {i+1}: 有効な要素が見つかりません")
@@ -1048,7 +1475,7 @@ class ChromeAutomationTool:
                 for elem_data in valid_elements:
                     if elem_data['id'] not in initial_message_ids:
                         # Thinking系のクラスを持たない場合は正式な応答要素
-                        if 'thinking' not in elem_data['classes'].lower():
+                        if not _THINKING_CLASS_PATTERN.search(elem_data['classes']):
                             new_response_elements.append(elem_data)
 
                 current_element = None
@@ -1061,14 +1488,18 @@ class ChromeAutomationTool:
                     current_element = latest_response['element']
                     current_text = latest_response['text']
                     element_type = f"新応答要素ID={latest_response['id']}"
-                    self.logger.info(f"チェック {i+1}: ✅ 新しい応答要素が出現しました！Thinking状態終了 (ID={latest_response['id']})")
-                    self.logger.debug(f"チェック {i+1}: {element_type}, 長さ={len(current_text)}文字")
+                    if latest_response['id'] != announced_response_id:
+                        # 出現時に1回だけ出力（以降のチェックではDEBUG時のみ）
+                        announced_response_id = latest_response['id']
+                        self.logger.info(f"チェック {i+1}: ✅ 新しい応答要素が出現しました！Thinking状態終了 (ID={latest_response['id']})")
+                    elif self.logger.isEnabledFor(logging.DEBUG):
+                        self.logger.debug(f"チェック {i+1}: {element_type}, 長さ={len(current_text)}文字")
                 elif thinking_element:
                     # Thinking要素のみ存在
                     current_element = thinking_element['element']
                     current_text = thinking_element['text']
                     element_type = f"Thinking要素ID={thinking_element['id']}"
-                    self.logger.debug(f"チェック {i+1}: {element_type}, 長さ={len(current_text)}文字")
+                    self.logger.debug("チェック %d: %s, 長さ=%d文字", i + 1, element_type, len(current_text))
 
                     # Thinking状態のチェック
                     if self.is_thinking_state(current_text, "ストリーミング待機"):
@@ -1078,9 +1509,11 @@ class ChromeAutomationTool:
                             self.logger.info(f"前回: '{previous_thinking_text[:50]}{'...' if len(previous_thinking_text) > 50 else ''}'")
                             self.logger.info(f"今回: '{current_text[:50]}{'...' if len(current_text) > 50 else ''}'")
 
-                        self.logger.debug(f"チェック {i+1}: まだThinking状態 - {current_text[:20]}...")
+                        self.logger.debug("チェック %d: まだThinking状態 - %.20s...", i + 1, current_text)
+                        # テキストが変化していれば短い間隔に戻し、変化がなければ間隔を延ばす
+                        backoff_index = 0 if current_text != previous_thinking_text else min(backoff_index + 1, len(_POLL_BACKOFF) - 1)
                         previous_thinking_text = current_text
-                        time.sleep(check_interval)
+                        time.sleep(min(_POLL_BACKOFF[backoff_index], check_interval))
                         continue
                     else:
                         self.logger.info(f"チェック {i+1}: ✅ Thinking状態が終了しました！ (Thinking要素ID={thinking_element['id']})")
@@ -1099,19 +1532,28 @@ class ChromeAutomationTool:
                         self.logger.debug(f"Thinking終了時のテキスト内容: {current_text[:50]}...")
                 else:
                     self.logger.warning(f"チェック {i+1}: 監視可能な要素が見つかりません")
-                    time.sleep(check_interval)
+                    time.sleep(min(_POLL_BACKOFF[backoff_index], check_interval))
+                    backoff_index = min(backoff_index + 1, len(_POLL_BACKOFF) - 1)
                     continue
 
-                # Thinking終了直後の5秒待機
-                self.logger.info("Thinking状態が終了しました。5秒待機してからエラーチェックを開始します...")
-                time.sleep(5)
+                # Thinking終了直後は、新しい応答要素か再生成ボタンが現れるまで最大5秒待つ（初回のみ）
+                if not thinking_settled:
+                    thinking_settled = True
+                    if not new_response_elements:
+                        self.logger.info("Thinking状態が終了しました。応答要素か再生成ボタンの出現を待ってからエラーチェックを開始します...")
+                        try:
+                            WebDriverWait(self.driver, 5, poll_frequency=0.15).until(
+                                lambda d: d.execute_script(_RESPONSE_OR_REGENERATE_JS, list(initial_message_ids))
+                            )
+                        except TimeoutException:
+                            self.logger.debug("5秒以内に応答要素・再生成ボタンの出現を検出できませんでした")
 
                 # エラーメッセージの検出
                 self.logger.info("=== エラーチェック開始 ===")
                 self.logger.info("再生成メッセージの有無をチェック中...")
 
                 # 方法1: テキスト内容での判定
-                text_based_error = "応答を再生成" in current_text or "再生成" in current_text
+                text_based_error = "再生成" in current_text  # 「応答を再生成」も含む
                 self.logger.info(f"テキスト内容チェック結果: {'検出' if text_based_error else '未検出'}")
 
                 # 方法2: DOM要素での判定
@@ -1145,7 +1587,7 @@ class ChromeAutomationTool:
                 # テキスト安定性チェック
                 if current_text == previous_text and len(current_text) > 50:
                     stable_count += 1
-                    self.logger.debug(f"安定カウント: {stable_count}/{stable_threshold} ({element_type})")
+                    self.logger.debug("安定カウント: %d/%d (%s)", stable_count, stable_threshold, element_type)
 
                     if stable_count >= stable_threshold:
                         cleaned_text = self.clean_response_text(current_text)
@@ -1155,9 +1597,13 @@ class ChromeAutomationTool:
                     if len(current_text) > 0:
                         stable_count = 0
                         previous_text = current_text
-                        self.logger.debug(f"テキスト更新: {len(current_text)}文字 ({element_type})")
+                        self.logger.debug("テキスト更新: %d文字 (%s)", len(current_text), element_type)
 
-                time.sleep(check_interval)
+                # 次のチェックまで待機（完了判定に十分なテキストがあれば、コピーボタンが増えた時点で即座に次のチェックへ進む）
+                if len(current_text) > 100:
+                    self.wait_for_copy_button_increase(check_interval)
+                else:
+                    time.sleep(check_interval)
 
             except Exception as e:
                 self.logger.error(f"新ストリーミングチェック {i+1} エラー: {e}")
@@ -1166,7 +1612,7 @@ class ChromeAutomationTool:
 
         # タイムアウト処理
         self.logger.warning(f"=== 新ストリーミングタイムアウト ===")
-        self.logger.warning(f"タイムアウト時間: {timeout}秒, チェック回数: {max_checks}回")
+        self.logger.warning(f"タイムアウト時間: {timeout}秒, チェック回数: {checks_done}回")
         self.logger.warning(f"最後のテキスト: {self.mask_text_for_debug(previous_text)}")
         self.logger.warning("再生成ボタンチェックのためNoneを返します")
         return None
@@ -1176,37 +1622,21 @@ class ChromeAutomationTool:
         if not text:
             return text
 
-        # 「コピー」や「Copy」以下のテキストを除去
-        copy_indicators = ["コピー", "Copy", "copy"]
-
-        for indicator in copy_indicators:
-            if indicator in text:
-                # 「コピー」の位置を見つけて、その前までのテキストを取得
-                copy_index = text.find(indicator)
-                if copy_index > 0:
-                    # コピーボタンより前の部分を取得
-                    cleaned_text = text[:copy_index].strip()
-                    self.logger.debug(f"「{indicator}」以下を除去: {len(text)} → {len(cleaned_text)}文字")
-                    return cleaned_text
-
-        # その他の不要な要素を除去
-        unwanted_patterns = [
-            # ボタンテキスト
-            "再生成", "Regenerate", "いいね", "Like", "シェア", "Share",
-            # ナビゲーション要素
-            "次へ", "戻る", "Previous", "Next",
-            # UI要素
-            "メニュー", "Menu", "設定", "Settings"
-        ]
+        # 「コピー」や「Copy」以下のテキストを除去（優先順に試し、含まれる最初のインジケーターの位置で切る）
+        for indicator, pattern in _COPY_INDICATOR_PATTERNS:
+            match = pattern.search(text)
+            if match and match.start() > 0:
+                # コピーボタンより前の部分を取得
+                cleaned_text = text[:match.start()].strip()
+                self.logger.debug(f"「{indicator}」以下を除去: {len(text)} → {len(cleaned_text)}文字")
+                return cleaned_text
 
+        # その他の不要な要素を除去（文章の80%以降にある最初のパターンから後ろを1回の走査で除去）
         cleaned_text = text
-        for pattern in unwanted_patterns:
-            if pattern in cleaned_text:
-                # パターンが文末近くにある場合は除去
-                pattern_index = cleaned_text.rfind(pattern)
-                if pattern_index > len(cleaned_text) * 0.8:  # 文章の80%以降にある場合
-                    cleaned_text = cleaned_text[:pattern_index].strip()
-                    self.logger.debug(f"不要なパターン「{pattern}」を除去")
+        match = _UNWANTED_PATTERN.search(cleaned_text, int(len(cleaned_text) * 0.8) + 1)
+        if match:
+            cleaned_text = cleaned_text[:match.start()].strip()
+            self.logger.debug(f"不要なパターン「{match.group(0)}」以降を除去")
 
         # 改行が検出されたら同じ場所にもう一つ改行を追加
         cleaned_text = cleaned_text.strip()
@@ -1233,19 +1663,13 @@ class ChromeAutomationTool:
 
     def count_existing_responses(self):
         """既存の応答要素数をカウント"""
-        response_selectors = [
-            ".thinking_prompt",
-            ".response_text",
-            ".assistant-message",
-            ".ai-response",
-            ".chat-response"
-        ]
-
         max_count = 0
         try:
-            for selector in response_selectors:
-                elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                max_count = max(max_count, len(elements))
+            # 全セレクターの要素数を1回のexecute_scriptで取得
+            counts = self.driver.execute_script(
+                "return arguments[0].map(s => document.querySelectorAll(s).length);", _RESPONSE_SELECTORS
+            )
+            max_count = max(counts)
             self.logger.debug(f"既存応答数カウント結果: {max_count}")
         except Exception as e:
             self.logger.debug(f"既存応答数カウントエラー: {e}")
@@ -1255,57 +1679,40 @@ class ChromeAutomationTool:
     def count_existing_copy_buttons(self):
         """既存のコピーボタン数をカウント"""
         try:
-            copy_buttons = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'コピー') or contains(text(), 'Copy')]")
-            visible_copy_buttons = [btn for btn in copy_buttons if btn.is_displayed()]
-            count = len(visible_copy_buttons)
+            count = self.driver.execute_script(_COUNT_COPY_BUTTONS_JS)
             self.logger.debug(f"既存コピーボタン数: {count}")
             return count
         except Exception as e:
             self.logger.debug(f"既存コピーボタン数カウントエラー: {e}")
             return 0
 
+    def get_max_message_id(self):
+        """既存のmessage-content-idの最大値を取得（取得できなければ0）"""
+        try:
+            max_id = self.driver.execute_script(_MAX_MESSAGE_ID_JS)
+            self.logger.debug(f"既存の最大メッセージID: {max_id}")
+            return max_id
+        except Exception as e:
+            self.logger.debug(f"最大メッセージID取得エラー: {e}")
+            return 0
+
     def check_copy_button_near_current_response(self, current_element):
         """現在の応答要素の近くにコピーボタンがあるかチェック"""
         try:
             if not current_element:
                 return False
 
-            # 現在の応答要素の親要素やその周辺でコピーボタンを探す
-            parent_element = current_element
+            # 親要素（最大5階層上まで）と次の兄弟要素（3つまで）をブラウザ側で1回でチェック
+            found = self.driver.execute_script(_COPY_NEAR_ELEMENT_JS, current_element)
 
-            # 複数レベルの親要素をチェック
-            for level in range(5):  # 最大5階層上まで確認
-                try:
-                    # 現在の要素内でコピーボタンを探す
-                    copy_buttons_in_area = parent_element.find_elements(By.XPATH, ".//*[contains(text(), 'コピー') or contains(text(), 'Copy')]")
-
-                    if copy_buttons_in_area:
-                        # 表示されているコピーボタンがあるかチェック
-                        visible_copies = [btn for btn in copy_buttons_in_area if btn.is_displayed()]
-                        if visible_copies:
-                            self.logger.debug(f"レベル{level}の親要素でコピーボタンを発見: {len(visible_copies)}個")
-                            return True
-
-                    # 次の親要素に移動
-                    parent_element = parent_element.find_element(By.XPATH, "..")
-
-                except:
-                    break
-
-            # 応答要素の次の兄弟要素もチェック
-            try:
-                next_siblings = current_element.find_elements(By.XPATH, "./following-sibling::*")
-                for sibling in next_siblings[:3]:  # 最初の3つの兄弟要素をチェック
-                    copy_buttons_in_sibling = sibling.find_elements(By.XPATH, ".//*[contains(text(), 'コピー') or contains(text(), 'Copy')]")
-                    if copy_buttons_in_sibling:
-                        visible_copies = [btn for btn in copy_buttons_in_sibling if btn.is_displayed()]
-                        if visible_copies:
-                            self.logger.debug(f"兄弟要素でコピーボタンを発見: {len(visible_copies)}個")
-                            return True
-            except:
-                pass
-
-            return False
+            if not found:
+                return False
+            level, count = found
+            if level >= 0:
+                self.logger.debug(f"レベル{level}の親要素でコピーボタンを発見: {count}個")
+            else:
+                self.logger.debug(f"兄弟要素でコピーボタンを発見: {count}個")
+            return True
 
         except Exception as e:
             self.logger.debug(f"コピーボタン近接チェックエラー: {e}")
@@ -1314,36 +1721,30 @@ class ChromeAutomationTool:
     def check_copy_button_after_current_prompt(self):
         """現在送信したプロンプトの後にコピーボタンがあるかチェック"""
         try:
-            if not hasattr(self, 'current_prompt_text') or not self.current_prompt_text:
+            if not self.current_prompt_text:
                 return False
 
-            # ページ内で送信したプロンプトテキストを含む要素を探す
-            prompt_text_short = self.current_prompt_text[:50]  # 最初の50文字で検索
-
-            # プロンプトテキストを含む要素を探す
-            xpath_query = f"//*[contains(text(), '{prompt_text_short}')]"
-
             try:
-                prompt_elements = self.driver.find_elements(By.XPATH, xpath_query)
-
-                for prompt_element in prompt_elements:
-                    if prompt_element.is_displayed():
-                        self.logger.debug(f"プロンプト要素を発見: {prompt_element.text[:100]}...")
+                # 表示中のプロンプト要素の後にコピーボタンがあるかをブラウザ側で1回でチェック
+                prompt_text = self.driver.execute_script(_COPY_AFTER_PROMPT_JS, self._prompt_search_text)
 
-                        # このプロンプト要素の後にコピーボタンがあるかチェック
-                        # 次の兄弟要素や親要素の次の兄弟要素を確認
-                        if self.find_copy_button_after_element(prompt_element):
-                            return True
+                if prompt_text is not None:
+                    self.logger.debug(f"プロンプト要素を発見: {prompt_text}...")
+                    self.logger.debug("プロンプト要素後にコピーボタンを発見")
+                    return True
 
             except Exception as e:
                 self.logger.debug(f"プロンプト要素検索エラー: {e}")
 
             # より広範囲にプロンプト文字列を検索
             try:
-                page_source = self.driver.page_source
-                if self.current_prompt_text in page_source:
-                    self.logger.debug("ページソース内でプロンプトテキストを確認")
+                if self._prompt_found_in_page != self.current_prompt_text:
+                    # ページソースを転送せず、ブラウザ側で表示テキストを検索（結果は真偽値のみ）
+                    if self.driver.execute_script(_PROMPT_IN_PAGE_JS, self.current_prompt_text):
+                        self._prompt_found_in_page = self.current_prompt_text
+                        self.logger.debug("ページ内でプロンプトテキストを確認")
 
+                if self._prompt_found_in_page == self.current_prompt_text:
                     # コピーボタンがプロンプト送信後に増えているかチェック
                     current_copy_count = self.count_existing_copy_buttons()
                     if current_copy_count > self.existing_copy_button_count:
@@ -1351,7 +1752,7 @@ class ChromeAutomationTool:
                         return True
 
             except Exception as e:
-                self.logger.debug(f"ページソース検索エラー: {e}")
+                self.logger.debug(f"ページ内プロンプト検索エラー: {e}")
 
             return False
 
@@ -1362,33 +1763,11 @@ class ChromeAutomationTool:
     def find_copy_button_after_element(self, element):
         """指定要素の後にコピーボタンがあるかチェック"""
         try:
-            # 要素の後の兄弟要素をチェック
-            following_elements = element.find_elements(By.XPATH, "./following-sibling::*")
-
-            for following in following_elements[:10]:  # 最初の10個をチェック
-                copy_buttons = following.find_elements(By.XPATH, ".//*[contains(text(), 'コピー') or contains(text(), 'Copy')]")
-                if copy_buttons:
-                    visible_copies = [btn for btn in copy_buttons if btn.is_displayed()]
-                    if visible_copies:
-                        self.logger.debug("プロンプト要素後にコピーボタンを発見")
-                        return True
-
-            # 親要素の次の兄弟要素もチェック
-            try:
-                parent = element.find_element(By.XPATH, "..")
-                parent_following = parent.find_elements(By.XPATH, "./following-sibling::*")
-
-                for following in parent_following[:5]:  # 最初の5個をチェック
-                    copy_buttons = following.find_elements(By.XPATH, ".//*[contains(text(), 'コピー') or contains(text(), 'Copy')]")
-                    if copy_buttons:
-                        visible_copies = [btn for btn in copy_buttons if btn.is_displayed()]
-                        if visible_copies:
-                            self.logger.debug("プロンプト親要素後にコピーボタンを発見")
-                            return True
-            except:
-                pass
-
-            return False
+            # 後の兄弟要素（10個まで）と親要素の次の兄弟要素（5個まで）をブラウザ側で1回でチェック
+            found = self.driver.execute_script(_COPY_AFTER_ELEMENT_JS, element)
+            if found:
+                self.logger.debug("プロンプト要素後にコピーボタンを発見")
+            return found
 
         except Exception as e:
             self.logger.debug(f"要素後コピーボタン検索エラー: {e}")
@@ -1397,8 +1776,10 @@ class ChromeAutomationTool:
     def get_latest_message_content(self, wait_for_streaming=True):
         """message-content-id属性を持つ要素から最新の応答を取得"""
         try:
-            # message-content-id属性を持つすべての要素を取得
-            message_elements = self.driver.find_elements(By.CSS_SELECTOR, "[message-content-id]")
+            # message-content-id属性を持つすべての要素の情報を1回のexecute_scriptで取得
+            message_elements = self.driver.execute_script(
+                _MESSAGE_ELEMENTS_JS, self.logger.isEnabledFor(logging.DEBUG)
+            )
 
             if not message_elements:
                 self.logger.debug("get_latest_message_content: message-content-id要素が見つかりません。Noneを返します。 (1)")
@@ -1406,70 +1787,56 @@ class ChromeAutomationTool:
 
             self.logger.info(f"=== デバッグ: message-content-id要素を{len(message_elements)}個発見 ===")
 
-            # IDでソートして最新を特定
-            elements_with_id = []
-            for i, element in enumerate(message_elements):
-                if element.is_displayed():
-                    content_id = element.get_attribute("message-content-id")
-                    if content_id and content_id.isdigit():
-                        text_content = element.text.strip()
-                        element_classes = element.get_attribute("class") or ""
-
-                        # 詳細デバッグ情報（プライバシー保護）
-                        self.logger.info(f"要素{i+1}: ID={content_id}, テキスト長={len(text_content)}文字, クラス={element_classes}")
-                        masked_preview = self.mask_text_for_debug(text_content)
-                        self.logger.info(f"  プレビュー: {masked_preview}")
-                        self.logger.debug(f"  [HTML]: {element.get_attribute('outerHTML')}")
-
-                        # エラーメッセージは候補から除外
-                        if "応答の生成中にエラーが発生" in text_content or "再生成" in text_content:
-                            self.logger.info(f"  ✗ エラーメッセージのため除外: {text_content[:50]}...")
-                            continue
-
-                        elements_with_id.append((int(content_id), element, text_content))
-                    else:
-                        self.logger.debug(f"要素{i+1}: 無効なID={content_id}")
-                else:
-                    self.logger.debug(f"要素{i+1}: 非表示")
-
-            if not elements_with_id:
-                self.logger.debug("get_latest_message_content: 有効なmessage-content-id要素が見つかりません。Noneを返します。 (2)")
-                return None
-
-            # IDでソート（降順 = 最新が最初）
-            elements_with_id.sort(key=lambda x: x[0], reverse=True)
+            # 1回の走査で、エラーメッセージと送信したプロンプトを除いた最大IDの要素を特定
+            verbose = self.logger.isEnabledFor(logging.DEBUG)  # 要素ごとの詳細ログはDEBUG時のみ
+            prompt_texts = {self.current_prompt_text.strip(), self.original_user_prompt.strip()}
+            latest = None  # (ID, 要素, テキスト)
+            valid_count = 0
+            for i, info in enumerate(message_elements):
+                if not info['displayed']:
+                    if verbose:
+                        self.logger.debug(f"要素{i+1}: 非表示")
+                    continue
 
-            self.logger.info(f"=== 有効な要素一覧（ID順） ===")
-            for content_id, element, text_content in elements_with_id:
-                masked_content = self.mask_text_for_debug(text_content, max_preview=10)
-                self.logger.info(f"ID={content_id}: {masked_content}")
-                self.logger.debug(f"  [HTML]: {element.get_attribute('outerHTML')}")
+                content_id = info['id']
+                if not content_id.isdigit():
+                    if verbose:
+                        self.logger.debug(f"要素{i+1}: 無効なID={content_id}")
+                    continue
 
-            # プロンプト送信後に新しく現れた応答らしい要素を探す
-            new_elements = []
-            prompt_texts_to_check = []
-            if self.original_user_prompt:
-                prompt_texts_to_check.append(self.original_user_prompt.strip())
-            if self.current_prompt_text:
-                prompt_texts_to_check.append(self.current_prompt_text.strip())
+                text_content = info['text']
+                if verbose:
+                    # 詳細デバッグ情報（プライバシー保護）
+                    self.logger.debug(f"要素{i+1}: ID={content_id}, テキスト長={len(text_content)}文字, クラス={info['classes']}")
+                    self.logger.debug(f"  プレビュー: {self.mask_text_for_debug(text_content)}")
+                    self.logger.debug(f"  [HTML]: {info['html']}")
+
+                # エラーメッセージは候補から除外
+                if _ERROR_TEXT_PATTERN.search(text_content):
+                    if verbose:
+                        self.logger.debug(f"  ✗ エラーメッセージのため除外: {text_content[:50]}...")
+                    continue
+                valid_count += 1
 
-            for content_id, element, text_content in elements_with_id:
                 # プロンプトと完全一致する場合のみ除外する
-                is_prompt_match = text_content.strip() == self.current_prompt_text.strip() or text_content.strip() == self.original_user_prompt.strip()
-                self.logger.debug(f"  要素ID={content_id}: プロンプトと一致={is_prompt_match}, テキスト長={len(text_content)}")
-                if is_prompt_match:
-                    self.logger.info(f"  ✗ ID={content_id}は送信したプロンプトと完全一致するため除外")
+                if text_content in prompt_texts:
+                    if verbose:
+                        self.logger.debug(f"  ✗ ID={content_id}は送信したプロンプトと完全一致するため除外")
                     continue
 
-                # 応答候補として追加
-                new_elements.append((content_id, element, text_content))
+                if latest is None or int(content_id) > latest[0]:
+                    latest = (int(content_id), info['element'], text_content)
 
-            if not new_elements:
+            if not valid_count:
+                self.logger.debug("get_latest_message_content: 有効なmessage-content-id要素が見つかりません。Noneを返します。 (2)")
+                return None
+
+            if latest is None:
                 self.logger.warning("get_latest_message_content: プロンプト送信後の新しい応答候補が見つかりません。Noneを返します。 (3)")
                 return None
 
             # 最新のID（最大ID）を持つ要素を選択
-            latest_id, latest_element, latest_text = new_elements[0]
+            latest_id, latest_element, latest_text = latest
             masked_response = self.mask_text_for_debug(latest_text)
             self.logger.info(f"🎯 最新応答を特定: message-content-id={latest_id}, 応答内容={masked_response}")
 
@@ -1581,27 +1948,57 @@ class ChromeAutomationTool:
         """テキストをMarkdownファイルに保存"""
         self.logger.debug(f"save_to_markdown: 保存テキスト長={len(text)}文字, プロンプト={self.mask_text_for_debug(prompt)}")
         self.prompt_counter += 1
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # 日時は1回だけ取得してファイル名と本文で共用
+        now = datetime.now()
+
+        if self.batch_output:
+            # バッチ出力モードでは1行1件のJSONLとして追記する（中断時に失われないよう1件ごとに書き出す）
+            if self._batch_fp is None:
+                self.batch_output.parent.mkdir(parents=True, exist_ok=True)
+                self._batch_fp = open(self.batch_output, 'ab')
+            line = json.dumps({"prompt": prompt, "response": text, "ts": now.isoformat(timespec="seconds")},
+                              ensure_ascii=False) + "\n"
+            self._batch_fp.write(line.encode('utf-8'))
+            self._batch_fp.flush()
+            self.logger.info(f"バッチ出力に追記しました: {self.batch_output} (#{self.prompt_counter})")
+            print(f"📁 応答をバッチファイルに追記しました: {self.batch_output}")
+            return self.batch_output
+
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
+        pretty_timestamp = now.strftime("%Y年%m月%d日 %H:%M:%S")
         #filename = f"output_{self.prompt_counter:03d}_{timestamp}.md"
-        filename = f"output_{timestamp}_{self.prompt_counter:03d}.md"
+        filename = _OUTPUT_FILENAME_TEMPLATE % (timestamp, self.prompt_counter)
 
-        output_dir = Path("outputs")
-        output_dir.mkdir(exist_ok=True)
+        # 保存先ディレクトリの作成は初回保存時のみ
+        if not self._output_dir_ready:
+            self._output_dir.mkdir(exist_ok=True)
+            self._output_dir_ready = True
 
-        filepath = output_dir / filename
+        filepath = self._output_dir / filename
         self.logger.info(f"save_to_markdown: 保存先ファイルパス: {filepath}")
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"# 自動取得結果 #{self.prompt_counter}\n\n")
-            f.write(f"**日時**: {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}\n\n")
-            f.write(f"**プロンプト**: {prompt}\n\n")
-            f.write(f"---\n\n")
-            f.write(text)
+        # ヘッダーと本文を結合して1回だけエンコードし、1回のwriteで書き込む
+        payload = (_MARKDOWN_HEADER_TEMPLATE % (self.prompt_counter, pretty_timestamp, prompt) + text).encode('utf-8')
+
+        # エンコード済みのバイト列をバッファ層を介さずにfdへ直接書き込む
+        fd = os.open(filepath, _OUTPUT_OPEN_FLAGS, 0o644)
+        try:
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
 
         self.logger.info(f"ファイルを保存しました: {filepath}")
         print(f"📁 応答をファイルに保存しました: {filename}")
         return filepath
 
+    def close_batch_output(self):
+        """バッチ出力ファイルを閉じる"""
+        if self._batch_fp:
+            self._batch_fp.close()
+            self._batch_fp = None
+
     def send_message(self, prompt_text):
         """
         テキスト入力と送信を統一的に扱うメソッド。
@@ -1625,9 +2022,8 @@ class ChromeAutomationTool:
 
             # 3. JavaScriptで確実に入力内容を設定し、イベントを発火
             self.logger.info("JavaScriptでテキストを設定し、inputイベントを発火させます。")
-            escaped_text = prompt_text.replace('\\', '\\\\').replace('"', '\"').replace('\n', '\\n')
-            self.driver.execute_script(f'arguments[0].value = "{escaped_text}";', text_input)
-            self.driver.execute_script('arguments[0].dispatchEvent(new Event("input", { bubbles: true }));', text_input)
+            # テキストは引数として渡す（エスケープ不要）。値の設定とイベント発火は1回のexecute_scriptで行う
+            self.driver.execute_script(_SET_INPUT_VALUE_JS, text_input, prompt_text)
 
             time.sleep(0.5) # イベントが処理されるのを少し待つ
 
@@ -1699,8 +2095,9 @@ class ChromeAutomationTool:
         self.logger.info(f"  - prompt_counter: {getattr(self, 'prompt_counter', 'undefined')}")
         self.logger.info("状態変数をリセット完了")
 
-        # プロンプト送信前の既存応答数とコピーボタン数を記録
+        # プロンプト送信前の既存応答数とコピーボタン数、最大メッセージIDを記録
         self.existing_response_count = self.count_existing_responses()
+        last_message_id = self.get_max_message_id()
         self.existing_copy_button_count = self.count_existing_copy_buttons()
         self.current_prompt_text = prompt_text
 
@@ -1713,8 +2110,13 @@ class ChromeAutomationTool:
             self.logger.error("メッセージ送信に失敗したため、処理を中断します。")
             return False, "SEND_FAILED"
 
-        # 少し待機してから応答をチェック
-        time.sleep(3)
+        # 送信後に新しいメッセージ要素（プロンプト以外）が現れるまで待機してから応答をチェック
+        try:
+            WebDriverWait(self.driver, 10, poll_frequency=0.2).until(
+                lambda d: d.execute_script(_NEW_MESSAGE_APPEARED_JS, last_message_id, prompt_text.strip())
+            )
+        except TimeoutException:
+            self.logger.warning("送信後10秒以内に新しいメッセージ要素を検出できませんでした - 応答チェックを続行します")
 
         self.logger.info("=== 応答テキスト取得フェーズ開始 ===")
         self.logger.info("get_response_text()を呼び出し中...")
@@ -1731,8 +2133,11 @@ class ChromeAutomationTool:
             self.logger.warning("再生成ボタンが検出されました - フォールバック処理が必要です")
             return False, "REGENERATE_ERROR_DETECTED"
 
-        self.logger.debug(f"process_single_prompt: ファイル保存条件評価前: response_text={repr(response_text)}, bool(response_text)={bool(response_text)}, エラーメッセージ有無={'応答の生成中にエラーが発生' in response_text if response_text else False}")
-        if response_text and "応答の生成中にエラーが発生" not in response_text:
+        # エラー文言の有無は1回だけ判定し、ログでも再利用する
+        has_error_message = bool(response_text) and "応答の生成中にエラーが発生" in response_text
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"process_single_prompt: ファイル保存条件評価前: response_text={repr(response_text)}, bool(response_text)={bool(response_text)}, エラーメッセージ有無={has_error_message}")
+        if response_text and not has_error_message:
             self.logger.debug(f"process_single_prompt: ファイル保存条件を満たしました。response_textの長さ={len(response_text)}")
             if save_file:
                 filepath = self.save_to_markdown(response_text, prompt_text)
@@ -1741,26 +2146,82 @@ class ChromeAutomationTool:
                 self.logger.info("処理が正常に完了しました（ファイル保存はスキップ）")
             return True, response_text
         else:
-            self.logger.warning(f"process_single_prompt: ファイル保存条件を満たしませんでした。response_text={self.mask_text_for_debug(response_text) if response_text else 'None'}, エラーメッセージ有無={'応答の生成中にエラーが発生' in response_text if response_text else False}")
-            # デバッグ情報を出力してページ構造を確認
-            self.debug_page_structure()
+            self.logger.warning(f"process_single_prompt: ファイル保存条件を満たしませんでした。response_text={self.mask_text_for_debug(response_text) if response_text else 'None'}, エラーメッセージ有無={has_error_message}")
+            # デバッグ時のみページ構造を出力して確認
+            if self.debug:
+                self.debug_page_structure()
             return False, response_text
 
+    def _start_input_reader(self):
+        """標準入力の先読みスレッドを開始（一度だけ。以降の入力はすべて_next_input()で受け取る）"""
+        if self._input_queue is None:
+            self._input_queue = queue.Queue(maxsize=4)
+            threading.Thread(target=self._read_inputs, daemon=True).start()
+
+    def _read_inputs(self):
+        """標準入力を1行ずつ読み取ってキューに積む（バックグラウンドスレッド、EOFでNoneを積んで停止）"""
+        while True:
+            try:
+                line = input()
+            except EOFError:
+                self._input_queue.put(None)
+                return
+            self._input_queue.put(line)
+
+    def _next_input(self, timeout=None):
+        """入力キューから次の1行を取得（timeout秒以内に入力がなければNone、Ctrl+Cを受け付けられるよう短い間隔で待つ）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+            if wait <= 0:
+                return None
+            try:
+                line = self._input_queue.get(timeout=wait)
+            except queue.Empty:
+                continue
+            if line is None:
+                # EOFは以降の呼び出しでも検出できるようキューに戻す
+                self._input_queue.put(None)
+                raise EOFError
+            return line.strip()
+
+    def _drain_inputs(self):
+        """入力キューに溜まっている先行入力をすべて取り出す"""
+        lines = []
+        while True:
+            try:
+                line = self._input_queue.get_nowait()
+            except queue.Empty:
+                return lines
+            if line is None:
+                self._input_queue.put(None)
+                return lines
+            lines.append(line.strip())
+
     def process_continuous_prompts(self):
         """継続的にプロンプトを処理する"""
         prompt_count = 0
 
+        # 処理中も次のプロンプトを入力できるよう、標準入力は別スレッドで先読みする
+        self._start_input_reader()
+        pending_prompts = []  # エラー確認の間に退避した先行入力
+
         while True:
             try:
                 prompt_count += 1
                 print(f"\n=== プロンプト {prompt_count} ===")
-                print("送信するプロンプトを入力してください:")
+                print("送信するプロンプトを入力してください（処理中に次のプロンプトを先に入力できます）:")
                 print("（終了したい場合は 'quit' または 'exit' と入力してください）")
 
-                prompt = input("プロンプト: ").strip()
+                print("プロンプト: ", end="", flush=True)
+                if pending_prompts:
+                    prompt = pending_prompts.pop(0)
+                    print(prompt)
+                else:
+                    prompt = self._next_input()
 
                 # 終了コマンドをチェック
-                if prompt.lower() in ['quit', 'exit', '終了', 'q']:
+                if prompt.lower() in _QUIT_COMMANDS:
                     print("プロンプト送信を終了します。")
                     break
 
@@ -1785,26 +2246,82 @@ class ChromeAutomationTool:
             except KeyboardInterrupt:
                 print("\n\nCtrl+Cが押されました。処理を中断しています...")
                 break
+            except EOFError:
+                print("\n入力が終了したため処理を終了します。")
+                break
             except Exception as e:
                 self.logger.error(f"継続処理中のエラー: {e}")
                 print(f"予期しないエラーが発生しました: {e}")
 
-                retry_input = input("処理を続行しますか？ (y/n): ").strip().lower()
+                # 先行入力されたプロンプトを回答と取り違えないよう、質問の前に退避しておく
+                pending_prompts.extend(self._drain_inputs())
+                if pending_prompts:
+                    print(f"（先行入力された{len(pending_prompts)}件のプロンプトは、続行する場合に順に処理します）")
+                print("処理を続行しますか？ (y/n): ", end="", flush=True)
+                try:
+                    retry_input = self._next_input().lower()
+                except (EOFError, KeyboardInterrupt):
+                    break
                 if retry_input not in ['y', 'yes', 'はい']:
                     break
 
+        # 送信されなかった先行入力を知らせる（後続のブラウザ終了確認の入力と取り違えないよう取り出しておく）
+        unsent_prompts = [line for line in pending_prompts + self._drain_inputs() if line]
+        if unsent_prompts:
+            print(f"先行入力された{len(unsent_prompts)}件のプロンプトは送信されませんでした。")
+            self.logger.info(f"未送信の先行入力: {len(unsent_prompts)}件")
+
         print(f"\n🎉 合計 {prompt_count - 1} 個のプロンプトを処理しました。")
         return True
 
-    def close(self):
+    def wait_for_enter(self, timeout):
+        """Enterキー入力を最大timeout秒待機（入力があればTrue、タイムアウトならFalse）"""
+        if self._input_queue is not None:
+            # 先読みスレッドが標準入力を読んでいるため、同じキューから受け取る（直接input()すると入力を取り合う）
+            self._drain_inputs()
+            try:
+                return self._next_input(timeout) is not None
+            except EOFError:
+                return True
+
+        if os.name == 'posix':
+            ready, _, _ = select.select([sys.stdin], [], [], timeout)
+            if not ready:
+                return False
+            try:
+                input()
+            except EOFError:
+                pass
+            return True
+
+        # Windowsでは標準入力にselectが使えないためスレッドで待機
+        entered = threading.Event()
+
+        def read_input():
+            try:
+                input()
+            except EOFError:
+                pass
+            entered.set()
+
+        threading.Thread(target=read_input, daemon=True).start()
+        return entered.wait(timeout)
+
+    def close(self, timeout=30):
         """ブラウザを閉じる"""
+        self.close_batch_output()
+        if self.driver and self.attach:
+            # 接続モードではブラウザを残し、次回の起動で再利用する
+            self.logger.info("接続モードのためブラウザは開いたままにします（次回起動時に再接続します）")
+            return
         if self.driver:
-            # ユーザーに確認してからブラウザを閉じる
+            # ユーザーに確認してからブラウザを閉じる（応答がなければtimeout秒後に自動で閉じる）
             try:
                 print("\nブラウザを閉じますか？")
                 print("ログイン状態は保持されます。")
-                print("Enterキーでブラウザを閉じる、Ctrl+Cで中断: ")
-                input()
+                print(f"Enterキーでブラウザを閉じる、Ctrl+Cで中断（{timeout}秒後に自動で閉じます）: ")
+                if not self.wait_for_enter(timeout):
+                    self.logger.info(f"{timeout}秒間入力がなかったためブラウザを閉じます")
                 self.driver.quit()
                 self.logger.info("ブラウザを閉じました（ログイン状態は保持されています）")
             except KeyboardInterrupt:
@@ -1814,7 +2331,16 @@ class ChromeAutomationTool:
 
 def main():
     """メイン関数"""
-    tool = ChromeAutomationTool(debug=True)
+    parser = argparse.ArgumentParser(description="Chrome自動操作ツール")
+    parser.add_argument("--attach", action="store_true",
+                        help=f"リモートデバッグポート（{_DEBUGGER_ADDRESS}）で起動済みのChromeに接続して再利用する")
+    parser.add_argument("--lean", action="store_true",
+                        help="画像読み込みやバックグラウンド通信を無効化してページ読み込みを軽くする")
+    parser.add_argument("--batch-output", metavar="PATH",
+                        help="応答をプロンプトごとのMarkdownではなく、指定したJSONLファイルに1行ずつ追記する")
+    args = parser.parse_args()
+
+    tool = ChromeAutomationTool(debug=True, attach=args.attach, lean=args.lean, batch_output=args.batch_output)
 
     try:
         # Chromeブラウザを起動